@@ -0,0 +1,354 @@
+"""
+Headless engine-vs-engine matches over a process pool.
+
+Agents are small picklable descriptions of an engine; every game builds fresh searches from them
+inside a worker. A match plays each opening twice with the colors swapped, so neither side profits
+from a lucky start or from moving first. Results are reported as a score with a Wilson confidence
+interval, the matching Elo difference, and optionally a sequential probability ratio test (SPRT)
+that ends the match as soon as the result is clear.
+"""
+import math
+import os
+import random
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from multiprocessing import Pool
+
+from src.ai import rollout
+from src.ai.evaluator import load_evaluator
+from src.ai.mcts import MCTS
+from src.ai.nn_mcts import NNMCTS
+from src.core.logger import logger
+from src.othello import bitops, color, symmetry
+from src.othello.position import Position
+
+# Evaluators loaded by this process, shared by all games it plays: path -> (modification time, evaluator)
+_evaluators = {}
+
+
+class Agent(ABC):
+    """Plays one game at a time: start, then select on its own turns and advance on every move"""
+    name = 'agent'
+
+    def start(self, position: Position):
+        pass
+
+    @abstractmethod
+    def select(self, position: Position) -> int:
+        """Square to play in a position with at least one legal move"""
+
+    def advance(self, square: int | None):
+        """Called after every move of either color. None for a pass"""
+        pass
+
+    @property
+    def evaluations(self) -> int:
+        """Leaf evaluations of the current game"""
+        return 0
+
+    def __repr__(self):
+        return self.name
+
+
+class RandomAgent(Agent):
+    name = 'random'
+
+    def select(self, position):
+        return bitops.random_square(position.legal_mask())
+
+
+class MCTSAgent(Agent):
+    def __init__(self, iters=100, time_limit: float = None, rollout_batch=1, name=None):
+        """
+        Rollout MCTS, keeping its tree between moves.
+        :param iters: Iterations per move. May be None when a time_limit is given
+        :param time_limit: Seconds per move
+        """
+        if iters is None and time_limit is None:
+            raise ValueError('Either iters or time_limit must be set')
+
+        self.iters = iters
+        self.time_limit = time_limit
+        self.rollout_batch = rollout_batch
+        self.name = name or (f'mcts-{iters}' if time_limit is None else f'mcts-{time_limit}s')
+        self._tree = None
+        self._evaluations = 0
+
+    def __getstate__(self):
+        return {**self.__dict__, '_tree': None}
+
+    def _new_tree(self, position):
+        return MCTS(position, iter_max=self.iters, rollout_batch=self.rollout_batch)
+
+    def start(self, position):
+        self._tree = self._new_tree(position)
+        self._evaluations = 0
+
+    def select(self, position):
+        visits = self._tree.root.visits
+        children = self._tree.search(return_nodes=True, time_limit=self.time_limit)
+        self._evaluations += self._tree.root.visits - visits
+        return children[0].square
+
+    def advance(self, square):
+        self._tree.advance(square)
+
+    @property
+    def evaluations(self):
+        return self._evaluations
+
+
+class NNAgent(MCTSAgent):
+    def __init__(self, model_path='model.npz', iters=100, time_limit: float = None, batch_size=16,
+                 rollout_mix=0.0, name=None):
+        """
+        NNMCTS guided by a network, loaded once per worker process.
+        :param model_path: model.h5 or weights exported by nn_numpy, see evaluator.load_evaluator
+        """
+        super().__init__(iters, time_limit, name=name or f'nn-{os.path.basename(model_path)}-{iters}')
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.rollout_mix = rollout_mix
+
+    def _new_tree(self, position):
+        # Files replaced in place, e.g. by a promotion, are loaded again, replacing the older network
+        mtime = os.path.getmtime(self.model_path)
+        cached = _evaluators.get(self.model_path)
+        if cached is None or cached[0] != mtime:
+            cached = _evaluators[self.model_path] = (mtime, load_evaluator(self.model_path))
+        return NNMCTS(position, cached[1], iter_max=self.iters, batch_size=self.batch_size,
+                      rollout_mix=self.rollout_mix)
+
+
+def openings(n, plies=4, seed=None) -> list[Position]:
+    """
+    Distinct positions after plies random moves from the start, counting symmetric variants as the
+    same position. Fewer than n are returned when there are not that many.
+    """
+    rng = random.Random(seed)
+    found = {}
+    for _ in range(n * 20):
+        if len(found) == n:
+            break
+
+        position = Position()
+        for _ in range(plies):
+            mask = position.legal_mask()
+            position = position.play(rng.choice(list(bitops.iter_squares(mask)))) if mask else position.pass_move()
+        if position.is_game_complete():
+            continue
+
+        key, _ = symmetry.canonical(position.black, position.white, position.current_player)
+        found.setdefault(key, position)
+
+    return list(found.values())
+
+
+def _play_game(black: Agent, white: Agent, opening: Position, seed) -> tuple[int, int, int]:
+    """
+    :return: (winner: color.BLACK, color.WHITE or 0 for a draw, black evaluations, white evaluations)
+    """
+    random.seed(seed)
+    rollout.seed(seed)
+    agents = {color.BLACK: black, color.WHITE: white}
+    for agent in agents.values():
+        agent.start(opening)
+
+    position = opening
+    while not position.is_game_complete():
+        if position.legal_mask() == 0:
+            square = None
+            position = position.pass_move()
+        else:
+            square = agents[position.current_player].select(position)
+            position = position.play(square)
+
+        for agent in agents.values():
+            agent.advance(square)
+
+    return position.winner(), black.evaluations, white.evaluations
+
+
+def wilson_interval(score: float, n: int, z=1.96) -> tuple[float, float]:
+    """Wilson score interval of a score (draws counting one half) over n games"""
+    if n == 0:
+        return 0.0, 1.0
+    center = (score + z * z / (2 * n)) / (1 + z * z / n)
+    half = z / (1 + z * z / n) * math.sqrt(score * (1 - score) / n + z * z / (4 * n * n))
+    return max(center - half, 0.0), min(center + half, 1.0)
+
+
+def elo_difference(score: float) -> float:
+    """Elo difference matching an expected score, infinite at 0 and 1"""
+    if score <= 0.0:
+        return -math.inf
+    if score >= 1.0:
+        return math.inf
+    return 400 * math.log10(score / (1 - score))
+
+
+def expected_score(elo: float) -> float:
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+@dataclass(frozen=True)
+class SPRT:
+    """
+    Tests H0: the Elo difference is elo0 against H1: it is elo1, with error rates alpha and beta,
+    using the normal approximation of the generalized SPRT over win, draw and loss counts.
+    Half a game is added to each count when estimating the score and its variance, so one-sided
+    results (all wins, all losses or all draws) still decide.
+    """
+    elo0: float = 0.0
+    elo1: float = 10.0
+    alpha: float = 0.05
+    beta: float = 0.05
+
+    @property
+    def bounds(self) -> tuple[float, float]:
+        return math.log(self.beta / (1 - self.alpha)), math.log((1 - self.beta) / self.alpha)
+
+    def llr(self, wins, draws, losses) -> float:
+        n = wins + draws + losses
+        if n == 0:
+            return 0.0
+        wins, draws, losses = wins + 0.5, draws + 0.5, losses + 0.5
+        total = wins + draws + losses
+        score = (wins + draws / 2) / total
+        variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / total
+        s0, s1 = expected_score(self.elo0), expected_score(self.elo1)
+        return (s1 - s0) * (2 * score - s0 - s1) * n / (2 * variance)
+
+    def decision(self, wins, draws, losses) -> str | None:
+        """'H1', 'H0', or None while the test is undecided"""
+        lower, upper = self.bounds
+        llr = self.llr(wins, draws, losses)
+        return 'H1' if llr >= upper else 'H0' if llr <= lower else None
+
+
+@dataclass
+class MatchResult:
+    a: str
+    b: str
+    wins: int = 0
+    draws: int = 0
+    losses: int = 0
+    evaluations: int = 0
+    seconds: float = 0.0
+    sprt: SPRT = None
+
+    def add(self, score: float, evaluations=0):
+        if score == 1.0:
+            self.wins += 1
+        elif score == 0.0:
+            self.losses += 1
+        else:
+            self.draws += 1
+        self.evaluations += evaluations
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    @property
+    def score(self) -> float:
+        """Score of a, draws counting one half"""
+        return (self.wins + self.draws / 2) / self.games if self.games else 0.5
+
+    def interval(self, z=1.96) -> tuple[float, float]:
+        return wilson_interval(self.score, self.games, z)
+
+    @property
+    def elo(self) -> float:
+        return elo_difference(self.score)
+
+    @property
+    def llr(self) -> float | None:
+        return self.sprt.llr(self.wins, self.draws, self.losses) if self.sprt is not None else None
+
+    @property
+    def decision(self) -> str | None:
+        return self.sprt.decision(self.wins, self.draws, self.losses) if self.sprt is not None else None
+
+    def __str__(self):
+        low, high = self.interval()
+        s = f'{self.a} vs {self.b}: +{self.wins} ={self.draws} -{self.losses} ({self.games} games), ' \
+            f'score {self.score:.3f} [{low:.3f}, {high:.3f}], ' \
+            f'Elo {self.elo:+.0f} [{elo_difference(low):+.0f}, {elo_difference(high):+.0f}], ' \
+            f'{self.games * 3600 / max(self.seconds, 1e-9):.0f} games/h'
+        if self.sprt is not None:
+            lower, upper = self.sprt.bounds
+            s += f', SPRT({self.sprt.elo0:g}, {self.sprt.elo1:g}) LLR {self.llr:.2f} ' \
+                 f'[{lower:.2f}, {upper:.2f}] {self.decision or "undecided"}'
+        return s
+
+
+class Arena:
+    def __init__(self, workers=None, opening_plies=4, seed=None):
+        """
+        :param workers: Processes playing games, all CPUs by default
+        :param opening_plies: Random moves of every opening. 0 starts all games from the initial position
+        :param seed: Seed of the openings and games
+        """
+        self.workers = workers or os.cpu_count()
+        self.opening_plies = opening_plies
+        self.rng = random.Random(seed)
+
+    def _tasks(self, a: Agent, b: Agent, games):
+        """Pairs of games on the same opening with swapped colors, as (a color, game args)"""
+        starts = openings(-(-games // 2), self.opening_plies, self.rng.getrandbits(32)) \
+            if self.opening_plies > 0 else [Position()]
+        base_seed = self.rng.getrandbits(32)
+        for g in range(games):
+            opening = starts[g // 2 % len(starts)]
+            if g % 2 == 0:
+                yield color.BLACK, (a, b, opening, base_seed + g)
+            else:
+                yield color.WHITE, (b, a, opening, base_seed + g)
+
+    def match(self, a: Agent, b: Agent, games=100, sprt: SPRT = None, pool: Pool = None) -> MatchResult:
+        """
+        Plays games between a and b, alternating colors.
+        :param sprt: Stops the match once the test is decided
+        :param pool: Pool to play in. A pool of its own is created by default. Under an SPRT, games are
+        queued a few per worker at a time; those still running in a given pool when the test ends the
+        match are finished but not counted.
+        :return: Result from the view of a
+        """
+        if games < 1:
+            raise ValueError(f'Expected at least 1 game. Received {games}')
+        if pool is None:
+            with Pool(self.workers) as own:
+                return self.match(a, b, games, sprt, own)
+
+        colors, args = zip(*self._tasks(a, b, games))
+        tasks = list(enumerate(args))
+        step = 4 * self.workers if sprt is not None else len(tasks)
+        result = MatchResult(a.name, b.name, sprt=sprt)
+        start = time.perf_counter()
+
+        for first in range(0, len(tasks), step):
+            for g, winner, black_evals, white_evals in pool.imap_unordered(_indexed_game, tasks[first:first + step]):
+                a_color = colors[g]
+                result.add(1.0 if winner == a_color else 0.5 if winner == 0 else 0.0, black_evals + white_evals)
+                if sprt is not None and result.decision is not None:
+                    break
+            if sprt is not None and result.decision is not None:
+                break
+
+        result.seconds = time.perf_counter() - start
+        logger.info(result)
+        return result
+
+    def round_robin(self, agents: list[Agent], games=100, pool: Pool = None) -> list[MatchResult]:
+        """Plays a match of the given length between every pair of agents"""
+        if pool is None:
+            with Pool(self.workers) as own:
+                return self.round_robin(agents, games, own)
+        return [self.match(a, b, games, pool=pool) for i, a in enumerate(agents) for b in agents[i + 1:]]
+
+
+def _indexed_game(item):
+    g, args = item
+    return (g, *_play_game(*args))
@@ -0,0 +1,198 @@
+import time
+
+import numpy as np
+
+from src.ai.rollout import random_rollout
+from src.ai.selection import SelectionPolicy, UCT
+from src.core.logger import logger
+from src.othello import bitops
+from src.othello.game_logic import GameBoard, Move
+from src.othello.position import Position
+
+PASS = -1  # Square of the single child of a node whose color to move has to pass
+
+# Bytes per node over all arrays of ArrayTree
+NODE_BYTES = sum(np.dtype(t).itemsize for t in (np.int32, np.int32, np.int8, np.int8, np.int32, np.float64,
+                                                 np.float32, np.uint64, np.uint64, np.int8))
+
+
+class ArrayTree:
+    def __init__(self, capacity=1_000_000):
+        """
+        Struct-of-arrays search tree. Node i is described by entry i of every array, and the
+        children of a node are stored contiguously from first_child[i] to first_child[i] + child_count[i].
+        Nothing is allocated per node, so large searches create no garbage for the collector.
+        :param capacity: Maximum number of nodes, see capacity_for_bytes
+        """
+        self.capacity = capacity
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.child_count = np.zeros(capacity, dtype=np.int8)
+        self.square = np.full(capacity, PASS, dtype=np.int8)
+        self.visits = np.zeros(capacity, dtype=np.int32)
+        self.wins = np.zeros(capacity, dtype=np.float64)
+        self.prior = np.ones(capacity, dtype=np.float32)
+        self.black = np.zeros(capacity, dtype=np.uint64)
+        self.white = np.zeros(capacity, dtype=np.uint64)
+        self.side = np.zeros(capacity, dtype=np.int8)
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return f'ArrayTree(size={self.size}/{self.capacity}, nbytes={self.nbytes})'
+
+    @staticmethod
+    def capacity_for_bytes(max_bytes: int) -> int:
+        """Number of nodes that fit in the given memory budget"""
+        return max_bytes // NODE_BYTES
+
+    @property
+    def nbytes(self) -> int:
+        return self.capacity * NODE_BYTES
+
+    def clear(self):
+        self.size = 0
+
+    def _store(self, i: int, parent: int, square: int, position: Position):
+        self.parent[i] = parent
+        self.first_child[i] = -1
+        self.child_count[i] = 0
+        self.square[i] = square
+        self.visits[i] = 0
+        self.wins[i] = 0
+        self.prior[i] = 1.0
+        self.black[i] = position.black
+        self.white[i] = position.white
+        self.side[i] = position.current_player
+
+    def add_root(self, position: Position) -> int:
+        self.clear()
+        self._store(0, -1, PASS, position)
+        self.size = 1
+        return 0
+
+    def position(self, i: int) -> Position:
+        return Position(int(self.black[i]), int(self.white[i]), int(self.side[i]))
+
+    def is_expanded(self, i: int) -> bool:
+        return self.child_count[i] > 0
+
+    def expand(self, i: int) -> bool:
+        """
+        Allocates every child of node i at once. A node whose color to move has no legal move
+        gets a single PASS child.
+        :return: False if the tree is full, in which case nothing is allocated
+        """
+        position = self.position(i)
+        mask = position.legal_mask()
+        count = mask.bit_count() or 1
+
+        if self.size + count > self.capacity:
+            return False
+
+        first = self.size
+        if mask == 0:
+            self._store(first, i, PASS, position.pass_move())
+        else:
+            for j, square in enumerate(bitops.iter_squares(mask)):
+                self._store(first + j, i, square, position.play(square))
+
+        self.first_child[i] = first
+        self.child_count[i] = count
+        self.size += count
+        return True
+
+    def children(self, i: int) -> range:
+        first = int(self.first_child[i])
+        return range(first, first + int(self.child_count[i]))
+
+    def backup(self, i: int, result, visits=1):
+        path = []
+        while i != -1:
+            path.append(i)
+            i = self.parent[i]
+        # A path never holds the same node twice, so fancy-index increments are safe
+        self.visits[path] += visits
+        self.wins[path] += result
+
+
+class ArrayMCTS:
+    def __init__(self, position: Position | GameBoard, iter_max=100, verbose=False, capacity=1_000_000,
+                 max_bytes=None, selection: SelectionPolicy = None):
+        """
+        MCTS over an ArrayTree. Behaves like MCTS (wins are counted for the color to move at the root
+        at every level), but expands all children of a leaf at once and selects with a vectorized UCB
+        over the child slice.
+        :param capacity: Maximum number of nodes in the tree
+        :param max_bytes: Memory cap for the tree. Overrides capacity when given
+        :param selection: Selection policy scoring each child slice, defaults to UCT
+        """
+        if isinstance(position, GameBoard):
+            position = Position.from_board(position)
+        if max_bytes is not None:
+            capacity = ArrayTree.capacity_for_bytes(max_bytes)
+
+        self.tree = ArrayTree(capacity)
+        self.tree.add_root(position)
+        self.iter_max = iter_max
+        self.verbose = verbose
+        self.selection = selection if selection is not None else UCT()
+
+    def search(self, return_nodes=False, time_limit: float = None) -> Move | list[tuple[Move, int, float]]:
+        """
+        :param return_nodes: Return (move, visits, wins) for every root child, most visited first
+        :param time_limit: Wall-clock seconds to search for. iter_max still caps the iterations when set
+        """
+        if self.iter_max is None and time_limit is None:
+            raise ValueError('Either iter_max or time_limit must be set')
+
+        iter_max = self.iter_max if self.iter_max is not None else float('inf')
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        color = int(self.tree.side[0])
+
+        i = 0
+        while i < iter_max:
+            node = self.tree_policy()
+            self.tree.backup(node, random_rollout(self.tree.position(node), color))
+            i += 1
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+        children = sorted(self.tree.children(0), key=lambda c: self.tree.visits[c], reverse=True)
+        if self.verbose:
+            logger.info(self.tree)
+            for c in reversed(children):
+                logger.info(f'Move: {self._move(c)} | Wins: {self.tree.wins[c]} | Visits: {self.tree.visits[c]}')
+
+        if return_nodes:
+            return [(self._move(c), int(self.tree.visits[c]), float(self.tree.wins[c])) for c in children]
+
+        return self._move(children[0]) if children else None
+
+    def _move(self, child: int) -> Move | None:
+        square = int(self.tree.square[child])
+        if square == PASS:
+            return None
+        return Move(int(self.tree.side[self.tree.parent[child]]), square)
+
+    def tree_policy(self) -> int:
+        tree = self.tree
+        node = 0
+        while True:
+            if not tree.is_expanded(node):
+                # Leaves are expanded on their second visit, and left alone when terminal or the tree is full
+                if tree.visits[node] == 0 and node != 0:
+                    return node
+                if tree.position(node).is_game_complete() or not tree.expand(node):
+                    return node
+            node = self.select_child(node)
+
+    def select_child(self, node: int) -> int:
+        tree = self.tree
+        first = int(tree.first_child[node])
+        end = first + int(tree.child_count[node])
+        scores = self.selection.scores(tree.wins[first:end], tree.visits[first:end], int(tree.visits[node]),
+                                       tree.prior[first:end])
+        return first + int(np.argmax(scores))
@@ -0,0 +1,166 @@
+"""
+Streaming training input over record files.
+
+Records are read chunk by chunk from memory-mapped files, passed through a shuffle buffer,
+randomly transformed by one of the 8 board symmetries and featurized batch by batch,
+so training never holds more than the shuffle buffer in memory and starts right away.
+"""
+import queue
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from src.ai import features, records, shards
+from src.othello import symmetry
+
+_SPLIT_BUCKETS = 1000
+
+
+def default_paths() -> list[Path]:
+    """The main record file and every shard"""
+    return [p for p in [Path(shards.DATA_PATH)] + shards.shard_paths() if p.exists()]
+
+
+def test_mask(recs: np.ndarray, test_fraction: float) -> np.ndarray:
+    """
+    Assigns records to the test split by a hash of their canonical position, so a position and its
+    symmetric variants always land in the same split, whichever file or chunk they are read from.
+    """
+    black, white, _ = symmetry.canonical_arrays(recs['black'], recs['white'])
+    h = (black * np.uint64(0x9E3779B97F4A7C15)) ^ white ^ recs['side'].astype(np.uint64)
+    return ((h >> np.uint64(32)) % np.uint64(_SPLIT_BUCKETS)) < int(test_fraction * _SPLIT_BUCKETS)
+
+
+def augment(recs: np.ndarray, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Applies a random symmetry to every record.
+    :return: (black, white, targets) of the transformed records
+    """
+    transforms = rng.integers(0, 8, len(recs))
+    black = recs['black'].copy()
+    white = recs['white'].copy()
+
+    for t in range(1, 8):
+        rows = transforms == t
+        if rows.any():
+            black[rows] = symmetry.transform(recs['black'][rows], t)
+            white[rows] = symmetry.transform(recs['white'][rows], t)
+
+    y = features.targets(recs)[np.arange(len(recs))[:, None], symmetry.SQUARE_INDEX[transforms]]
+    return black, white, y
+
+
+def prefetch(iterable, size=4):
+    """Runs an iterator in a background thread, keeping up to size items ready"""
+    q = queue.Queue(maxsize=size)
+    done = object()
+
+    def fill():
+        try:
+            for item in iterable:
+                q.put(item)
+        finally:
+            q.put(done)
+
+    threading.Thread(target=fill, daemon=True).start()
+    while (item := q.get()) is not done:
+        yield item
+
+
+class RecordStream:
+    def __init__(self, paths=None, batch_size=256, shuffle_buffer=65_536, augment=True, split='train',
+                 test_fraction=0.2, chunk_size=4096, seed=None):
+        """
+        Iterable over (x, y) batches of records. Every iteration is one epoch over the files.
+        :param paths: Record files, by default the main record file and every shard
+        :param batch_size: Samples per batch. The last batch of an epoch may be smaller
+        :param shuffle_buffer: Records shuffled together. 0 keeps the file order
+        :param augment: Transform every sample by a random board symmetry
+        :param split: 'train', 'test' or None for all records
+        :param test_fraction: Share of positions in the test split
+        :param chunk_size: Records read from a file at a time
+        :param seed: Seed of the shuffling and augmentation
+        """
+        if split not in ('train', 'test', None):
+            raise ValueError(f'Expected split train, test or None. Received {split}')
+        if batch_size < 1:
+            raise ValueError(f'Expected a batch size of at least 1. Received {batch_size}')
+
+        self.paths = [Path(p) for p in paths] if paths is not None else default_paths()
+        self.batch_size = batch_size
+        self.shuffle_buffer = shuffle_buffer
+        self.augment = augment
+        self.split = split
+        self.test_fraction = test_fraction
+        self.chunk_size = chunk_size
+        self.rng = np.random.default_rng(seed)
+
+    def __repr__(self):
+        return f'RecordStream({len(self.paths)} files, split={self.split}, batch_size={self.batch_size}, ' \
+               f'shuffle_buffer={self.shuffle_buffer}, augment={self.augment})'
+
+    def __len__(self):
+        """Approximate number of batches per epoch, from the record counts and the split fraction"""
+        n = sum(records.count(p) for p in self.paths)
+        if self.split == 'train':
+            n = round(n * (1 - self.test_fraction))
+        elif self.split == 'test':
+            n = round(n * self.test_fraction)
+        return max(-(-n // self.batch_size), 1)
+
+    def _chunks(self):
+        """Chunks of the split, in random order when shuffling"""
+        chunks = [(p, start) for p in self.paths for start in range(0, records.count(p), self.chunk_size)]
+        if self.shuffle_buffer:
+            self.rng.shuffle(chunks)
+
+        files = {}
+        for path, start in chunks:
+            if path not in files:
+                files[path] = records.load(path)
+            chunk = np.asarray(files[path][start:start + self.chunk_size])
+            if self.split is not None:
+                test = test_mask(chunk, self.test_fraction)
+                chunk = chunk[test if self.split == 'test' else ~test]
+            if len(chunk):
+                yield chunk
+
+    def _batch(self, recs: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        if self.augment:
+            black, white, y = augment(recs, self.rng)
+        else:
+            black, white, y = recs['black'], recs['white'], features.targets(recs)
+        return features.encode(black, white, recs['side']), y
+
+    def __iter__(self):
+        buffer = records.empty()
+        keep = self.shuffle_buffer // 2
+
+        for chunk in self._chunks():
+            buffer = np.concatenate((buffer, chunk))
+            if len(buffer) < max(self.shuffle_buffer, self.batch_size):
+                continue
+
+            if self.shuffle_buffer:
+                self.rng.shuffle(buffer)
+            n = (len(buffer) - keep) // self.batch_size * self.batch_size
+            for start in range(0, n, self.batch_size):
+                yield self._batch(buffer[start:start + self.batch_size])
+            buffer = buffer[n:]
+
+        if self.shuffle_buffer:
+            self.rng.shuffle(buffer)
+        for start in range(0, len(buffer), self.batch_size):
+            yield self._batch(buffer[start:start + self.batch_size])
+
+    def prefetched(self, size=4):
+        """One epoch, featurized in a background thread"""
+        return prefetch(iter(self), size)
+
+    def as_tf_dataset(self):
+        """tf.data.Dataset over this stream, prefetching batches. Imports TensorFlow."""
+        import tensorflow as tf
+        signature = (tf.TensorSpec((None, features.INPUT_SIZE), tf.float32), tf.TensorSpec((None, 64), tf.float32))
+        return tf.data.Dataset.from_generator(lambda: iter(self), output_signature=signature) \
+            .prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,254 @@
+from collections import OrderedDict
+from multiprocessing.sharedctypes import RawArray
+
+import numpy as np
+
+from src.ai.evaluator import Evaluator
+from src.ai.rollout import random_rollout_diff
+from src.ai.transposition import zobrist_hash
+from src.othello import symmetry
+from src.othello.position import Position
+
+DEFAULT_MIN_SAMPLES = 8
+
+_installed = None  # Cache set up in this process by install()
+
+
+def cache_key(position: Position, symmetric: bool) -> tuple[tuple[int, int, int], int]:
+    """
+    :return: (key, transform). With symmetric, the key is the canonical form shared by all symmetric
+    variants of the position and transform takes the position to it; otherwise Position.key() and 0.
+    """
+    if symmetric:
+        return symmetry.canonical(*position.key())
+    return position.key(), 0
+
+
+class EvalCache:
+    def __init__(self, capacity=100_000, min_samples=DEFAULT_MIN_SAMPLES, symmetric=True):
+        """
+        LRU cache of evaluations keyed by Position.key(), i.e. (black bits, white bits, color to move).
+        It holds either rollout statistics (see rollout) or network evaluations (see CachedEvaluator),
+        so use one cache per kind of evaluation.
+        :param capacity: Maximum number of entries. The least recently used entry is evicted when full
+        :param min_samples: Rollouts of a position to average before rollout serves the mean instead
+        of playing another game
+        :param symmetric: Key entries by symmetry.canonical, so the 8 symmetric variants of a position
+        share one entry
+        """
+        if capacity < 1:
+            raise ValueError(f'Expected a capacity of at least 1. Received {capacity}')
+        if min_samples < 1:
+            raise ValueError(f'Expected min_samples of at least 1. Received {min_samples}')
+
+        self.capacity = capacity
+        self.min_samples = min_samples
+        self.symmetric = symmetric
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f'EvalCache(size={len(self)}/{self.capacity}, hits={self.hits}, ' \
+               f'misses={self.misses}, evictions={self.evictions}, hit_rate={self.hit_rate():.2%})'
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: tuple[int, int, int]):
+        """Returns the cached value or None. Counts a hit or a miss."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: tuple[int, int, int], value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def rollout(self, position: Position, color: int) -> float:
+        """
+        Cached drop-in for rollout.random_rollout. Until a position has min_samples rollouts, each call
+        plays one more game and adds it to the position's running means; after that the mean is returned.
+        Wins of both colors are counted, since a draw is a win for neither.
+        :return: Win (1), loss or draw (0) or, once cached, the mean win rate of color
+        """
+        key, _ = cache_key(position, self.symmetric)
+        stats = self.entries.get(key)  # [wins of the color to move, wins of the other color, samples]
+
+        if stats is not None and stats[2] >= self.min_samples:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return (stats[0] if color == position.current_player else stats[1]) / stats[2]
+
+        self.misses += 1
+        diff = random_rollout_diff(position)
+        if stats is None:
+            stats = [0, 0, 0]
+            self.put(key, stats)
+        else:
+            self.entries.move_to_end(key)
+        stats[0] += diff > 0
+        stats[1] += diff < 0
+        stats[2] += 1
+
+        return int((diff if color == position.current_player else -diff) > 0)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+class SharedEvalCache:
+    def __init__(self, size=1 << 20, min_samples=DEFAULT_MIN_SAMPLES, symmetric=True):
+        """
+        Direct-mapped table of rollout statistics in shared memory, for worker processes of a Pool.
+        Create it in the parent and pass it to the workers through Pool(initializer=install, initargs=(cache,)).
+        A slot is picked by Zobrist hash and a colliding position replaces the older one.
+        Slots are read and written without a lock: a race can drop or misattribute a sample, which only
+        perturbs a mean of random rollouts. The shared counters are approximate for the same reason.
+        :param size: Number of slots. Each slot takes 37 bytes
+        :param min_samples: See EvalCache
+        :param symmetric: See EvalCache
+        """
+        if size < 1:
+            raise ValueError(f'Expected a size of at least 1. Received {size}')
+        if min_samples < 1:
+            raise ValueError(f'Expected min_samples of at least 1. Received {min_samples}')
+
+        self.size = size
+        self.min_samples = min_samples
+        self.symmetric = symmetric
+        self._raw = (RawArray('Q', size), RawArray('Q', size), RawArray('b', size),
+                     RawArray('d', size), RawArray('d', size), RawArray('I', size), RawArray('q', 2))
+        self._views()
+
+    def _views(self):
+        raw = self._raw
+        self.black = np.frombuffer(raw[0], dtype=np.uint64)
+        self.white = np.frombuffer(raw[1], dtype=np.uint64)
+        self.side = np.frombuffer(raw[2], dtype=np.int8)
+        self.wins = np.frombuffer(raw[3], dtype=np.float64)  # Of the color to move
+        self.opp_wins = np.frombuffer(raw[4], dtype=np.float64)
+        self.samples = np.frombuffer(raw[5], dtype=np.uint32)
+        self.counters = np.frombuffer(raw[6], dtype=np.int64)  # hits, misses
+
+    def __getstate__(self):
+        return {'size': self.size, 'min_samples': self.min_samples, 'symmetric': self.symmetric, '_raw': self._raw}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._views()
+
+    def __repr__(self):
+        return f'SharedEvalCache(size={self.size}, hits={self.hits}, misses={self.misses}, ' \
+               f'hit_rate={self.hit_rate():.2%})'
+
+    @property
+    def hits(self) -> int:
+        return int(self.counters[0])
+
+    @property
+    def misses(self) -> int:
+        return int(self.counters[1])
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def rollout(self, position: Position, color: int) -> float:
+        """Same as EvalCache.rollout"""
+        (black, white, side), _ = cache_key(position, self.symmetric)
+        i = zobrist_hash(black, white, side) % self.size
+        own = self.black[i] == black and self.white[i] == white and self.side[i] == side
+
+        samples = int(self.samples[i]) if own else 0
+        if samples >= self.min_samples:
+            self.counters[0] += 1
+            wins = self.wins[i] if color == side else self.opp_wins[i]
+            return float(wins / samples)
+
+        self.counters[1] += 1
+        diff = random_rollout_diff(position)
+        if not own:
+            self.black[i], self.white[i], self.side[i] = black, white, side
+            self.wins[i] = self.opp_wins[i] = self.samples[i] = 0
+        self.wins[i] += diff > 0
+        self.opp_wins[i] += diff < 0
+        self.samples[i] += 1
+
+        return int((diff if color == position.current_player else -diff) > 0)
+
+    def clear(self):
+        self.side[:] = 0
+        self.samples[:] = 0
+        self.counters[:] = 0
+
+
+def install(cache: EvalCache | SharedEvalCache | None):
+    """Sets the cache returned by installed() in this process. Usable as a Pool initializer."""
+    global _installed
+    _installed = cache
+
+
+def installed() -> EvalCache | SharedEvalCache | None:
+    return _installed
+
+
+class CachedEvaluator(Evaluator):
+    def __init__(self, evaluator: Evaluator, cache: EvalCache = None):
+        """
+        Serves repeated positions from an EvalCache and sends only the misses of a batch to the evaluator.
+        With a symmetric cache, priors are stored for the canonical position and mapped back through
+        the inverse transform.
+        :param cache: Cache for the (priors, value) of each position, a new EvalCache by default
+        """
+        self.evaluator = evaluator
+        self.cache = cache if cache is not None else EvalCache()
+
+    def __repr__(self):
+        return f'CachedEvaluator({self.cache})'
+
+    def predict(self, x):
+        return self.evaluator.predict(x)
+
+    def evaluate(self, positions):
+        priors = np.zeros((len(positions), 64), dtype=np.float32)
+        values = np.zeros(len(positions), dtype=np.float32)
+        missing = {}
+
+        for i, position in enumerate(positions):
+            key, t = cache_key(position, self.cache.symmetric)
+            cached = self.cache.get(key)
+            if cached is None:
+                missing.setdefault(key, []).append((i, t))
+            else:
+                priors[i] = symmetry.transform_squares(cached[0], symmetry.INVERSE[t])
+                values[i] = cached[1]
+
+        if missing:
+            rows = list(missing.values())
+            p, v = self.evaluator.evaluate([positions[r[0][0]] for r in rows])
+            for key, key_rows, prior, value in zip(missing, rows, p, v):
+                canonical_prior = symmetry.transform_squares(prior, key_rows[0][1])
+                self.cache.put(key, (canonical_prior, value))
+                for i, t in key_rows:
+                    priors[i] = symmetry.transform_squares(canonical_prior, symmetry.INVERSE[t])
+                    values[i] = value
+
+        return priors, values
@@ -0,0 +1,90 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from src.ai import features
+from src.ai.nn_numpy import NumpyNetwork
+from src.othello import batch, symmetry
+from src.othello.position import Position
+
+
+class Evaluator(ABC):
+    """
+    Evaluates positions with the policy network trained by nn.train. The network predicts, for every
+    square, the MCTS win ratio of the color to move after playing there. Subclasses implement predict.
+    """
+
+    @abstractmethod
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        """
+        :param x: Network inputs of shape (N, 129), see features.encode
+        :return: Network outputs of shape (N, 64), indexed by square
+        """
+
+    def evaluate(self, positions: list[Position]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Evaluates a batch of positions with one predict call. The network is trained on canonical positions
+        (see features.featurize), so every position is evaluated in its canonical form and the outputs are
+        mapped back to its own squares.
+        :return: (priors, values). priors has shape (N, 64): the outputs over the legal squares,
+        normalized to sum to 1. values has shape (N,): the best predicted win ratio over the legal
+        squares, i.e. the estimated win probability of the color to move. Positions without a legal
+        move get zero priors and a value of 0.5.
+        """
+        if len(positions) == 0:
+            return np.zeros((0, 64), dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+        black, white, transforms = symmetry.canonical_arrays([p.black for p in positions],
+                                                             [p.white for p in positions])
+        side = np.array([p.current_player for p in positions], dtype=np.int8)
+        outputs = np.asarray(self.predict(features.encode(black, white, side)), dtype=np.float32)
+        inverse = np.asarray(symmetry.INVERSE)[transforms]
+        outputs = outputs[np.arange(len(positions))[:, None], symmetry.SQUARE_INDEX[inverse]]
+        legal = batch.unpack([p.legal_mask() for p in positions])
+        return priors_and_values(outputs, legal)
+
+
+def priors_and_values(outputs: np.ndarray, legal: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Turns raw network outputs into move priors and position values.
+    :param outputs: Array of shape (N, 64)
+    :param legal: Boolean array of shape (N, 64) marking legal squares
+    """
+    masked = np.where(legal, np.clip(outputs, 1e-6, None), 0.0).astype(np.float32)
+    totals = masked.sum(axis=1, keepdims=True)
+    priors = np.divide(masked, totals, out=np.zeros_like(masked), where=totals > 0)
+
+    values = np.where(legal.any(axis=1), np.where(legal, outputs, -np.inf).max(axis=1), 0.5)
+    return priors, np.clip(values, 0.0, 1.0).astype(np.float32)
+
+
+class KerasEvaluator(Evaluator):
+    def __init__(self, model_path='model.h5'):
+        """Runs the network through TensorFlow. TensorFlow is only imported when this class is used."""
+        import tensorflow as tf
+        self.model = tf.keras.models.load_model(model_path)
+
+    def predict(self, x):
+        return self.model.predict(x, verbose=0)
+
+
+class NumpyEvaluator(Evaluator):
+    def __init__(self, weights_path='model.npz', dtype=np.float32, batch_size=None):
+        """
+        Runs the network with nn_numpy, without TensorFlow.
+        :param weights_path: .npz written by nn_numpy.export_weights
+        :param dtype: float32 or float16
+        :param batch_size: Rows per forward pass, None for whole batches
+        """
+        self.network = NumpyNetwork(weights_path, dtype)
+        self.batch_size = batch_size
+
+    def predict(self, x):
+        return self.network.predict(x, self.batch_size)
+
+
+def load_evaluator(path='model.h5', dtype=np.float32) -> Evaluator:
+    """NumpyEvaluator for .npz weights, KerasEvaluator otherwise"""
+    if path.endswith('.npz'):
+        return NumpyEvaluator(path, dtype)
+    return KerasEvaluator(path)
@@ -0,0 +1,122 @@
+import hashlib
+from pathlib import Path
+
+import numpy as np
+
+from src.ai import records
+from src.core.logger import logger
+from src.othello import symmetry
+from src.othello.position import Position
+
+INPUT_SIZE = 129  # 64 black squares, 64 white squares, color to move
+
+# Bump when the layout of cached features changes, so stale caches are not reused
+FEATURE_VERSION = 1
+CACHE_DIR = '.feature_cache'
+
+
+def unpack_bits(bits: np.ndarray) -> np.ndarray:
+    """
+    Unpacks a column of uint64 boards into bit arrays in the same order as nn.bits_to_array:
+    index 0 holds bit 63 and index 63 holds bit 0.
+    :param bits: uint64 array of shape (N,)
+    :return: uint8 array of shape (N, 64)
+    """
+    bits = np.asarray(bits, dtype=np.uint64).astype('>u8')
+    return np.unpackbits(bits.view(np.uint8).reshape(-1, 8), axis=1)
+
+
+def encode(black: np.ndarray, white: np.ndarray, current_player: np.ndarray) -> np.ndarray:
+    """
+    Builds network inputs the way nn.sanitize_data lays out x_train.
+    :return: float32 array of shape (N, 129)
+    """
+    x = np.empty((len(black), INPUT_SIZE), dtype=np.float32)
+    x[:, :64] = unpack_bits(black)
+    x[:, 64:128] = unpack_bits(white)
+    x[:, 128] = current_player
+    return x
+
+
+def encode_positions(positions: list[Position]) -> np.ndarray:
+    black = np.array([p.black for p in positions], dtype=np.uint64)
+    white = np.array([p.white for p in positions], dtype=np.uint64)
+    current_player = np.array([p.current_player for p in positions], dtype=np.int8)
+    return encode(black, white, current_player)
+
+
+def targets(recs: np.ndarray) -> np.ndarray:
+    """
+    Network targets of records: the win ratio of every searched move, 0 elsewhere.
+    :return: float32 array of shape (N, 64), indexed by square
+    """
+    visits = recs['visits']
+    return np.divide(recs['wins'], visits, out=np.zeros(visits.shape, dtype=np.float32), where=visits > 0)
+
+
+def canonicalize(recs: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Brings records into their symmetry.canonical form.
+    :return: (black, white, side, targets), with the targets moved along with the board
+    """
+    black, white, transforms = symmetry.canonical_arrays(recs['black'], recs['white'])
+    rows = np.arange(len(recs))[:, None]
+    return black, white, recs['side'], targets(recs)[rows, symmetry.SQUARE_INDEX[transforms]]
+
+
+def merge_duplicates(black: np.ndarray, white: np.ndarray, side: np.ndarray,
+                     y: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Keeps one row per distinct position, with the mean of its targets"""
+    keys = np.column_stack((black, white, side.astype(np.int64).astype(np.uint64)))
+    _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    y_sum = np.zeros((len(first), y.shape[1]), dtype=np.float64)
+    np.add.at(y_sum, inverse, y)
+    y_mean = (y_sum / np.bincount(inverse)[:, None]).astype(np.float32)
+    return black[first], white[first], side[first], y_mean
+
+
+def featurize(recs: np.ndarray, canonical=True) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Turns records into network inputs and targets.
+    :param canonical: Bring every position into its canonical form and merge positions that turn out
+    identical, so symmetric positions make up one sample
+    :return: (x, y) of shapes (N, 129) and (N, 64)
+    """
+    if canonical:
+        black, white, side, y = merge_duplicates(*canonicalize(recs))
+    else:
+        black, white, side, y = recs['black'], recs['white'], recs['side'], targets(recs)
+    return encode(black, white, side), y
+
+
+def file_hash(path) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_dataset(path, canonical=True, cache_dir=CACHE_DIR) -> tuple[np.ndarray, np.ndarray]:
+    """
+    featurize over a record file, cached on disk under the hash of the file's contents.
+    A changed dataset gets a new hash, so the cache never needs invalidating by hand.
+    :param cache_dir: Directory of the cached arrays, None to disable caching
+    """
+    if cache_dir is None:
+        return featurize(records.load(path), canonical)
+
+    cache = Path(cache_dir) / f'{file_hash(path)}-v{FEATURE_VERSION}-{"c" if canonical else "r"}.npz'
+    if cache.exists():
+        with np.load(cache) as data:
+            logger.info(f'Loaded features of {path} from {cache}')
+            return data['x'], data['y']
+
+    x, y = featurize(records.load(path), canonical)
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache.with_name(cache.stem + '.tmp.npz')
+    np.savez(tmp, x=x, y=y)
+    tmp.replace(cache)
+    logger.info(f'Featurized {path} into {len(x)} samples, cached in {cache}')
+    return x, y
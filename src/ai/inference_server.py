@@ -0,0 +1,218 @@
+"""
+Batched network inference shared by many search processes.
+
+One server process loads the network once. Clients in other processes send their inputs over a
+shared request queue; the server coalesces requests into micro-batches of up to max_batch rows,
+waiting at most max_latency seconds after the oldest request, runs one predict call per batch and
+sends every client its rows back on the client's own response queue. Errors of the network are
+sent back to the clients of the failed batch, and clients stop waiting once the server has not
+shown a sign of life for timeout seconds.
+"""
+import os
+import queue
+import time
+from multiprocessing import Process, Queue, Value
+from multiprocessing.sharedctypes import RawArray
+
+import numpy as np
+
+from src.ai.evaluator import Evaluator, load_evaluator
+from src.core.logger import logger
+
+# Slots of the shared statistics array, written by the server process only
+_REQUESTS, _BATCHES, _ROWS, _LATENCY_SUM, _LATENCY_MAX, _DEPTH, _DEPTH_MAX, _HEARTBEAT = range(8)
+
+# Seconds between heartbeats of an idle server, and between liveness checks of a waiting client
+_HEARTBEAT_INTERVAL = 0.5
+
+
+def _queue_depth(q: Queue) -> int:
+    try:
+        return q.qsize()
+    except NotImplementedError:  # macOS
+        return 0
+
+
+def _serve(model_path, dtype, requests: Queue, responses: list[Queue], stats, max_batch, max_latency):
+    stats[_HEARTBEAT] = time.monotonic()
+    try:
+        evaluator = load_evaluator(model_path, dtype)
+        load_error = None
+    except Exception as e:
+        logger.exception(f'Inference server could not load {model_path}')
+        evaluator = None
+        load_error = f'Inference server could not load {model_path}: {e!r}'
+    stopping = False
+
+    while not stopping:
+        stats[_HEARTBEAT] = time.monotonic()
+        try:
+            item = requests.get(timeout=_HEARTBEAT_INTERVAL)
+        except queue.Empty:
+            continue
+        if item is None:
+            break
+
+        batch = [item]
+        rows = len(item[3])
+        deadline = item[2] + max_latency
+        while rows < max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+            rows += len(item[3])
+
+        depth = _queue_depth(requests)
+        error = load_error
+        if error is None:
+            try:
+                out = evaluator.predict(np.concatenate([x for _, _, _, x in batch]))
+            except Exception as e:
+                logger.exception(f'Inference server failed on a batch of {rows} rows')
+                error = f'Inference server failed on a batch of {rows} rows: {e!r}'
+        now = time.monotonic()
+
+        start = 0
+        for slot, request_id, sent, x in batch:
+            responses[slot].put((request_id, None, error) if error is not None else
+                                (request_id, out[start:start + len(x)], None))
+            start += len(x)
+            stats[_LATENCY_SUM] += now - sent
+            stats[_LATENCY_MAX] = max(stats[_LATENCY_MAX], now - sent)
+
+        stats[_REQUESTS] += len(batch)
+        stats[_BATCHES] += 1
+        stats[_ROWS] += rows
+        stats[_DEPTH] = depth
+        stats[_DEPTH_MAX] = max(stats[_DEPTH_MAX], depth)
+
+
+class InferenceClient(Evaluator):
+    def __init__(self, requests: Queue, responses: list[Queue], next_slot: Value, stats, timeout=30.0):
+        """
+        Evaluator sending its predict calls to an InferenceServer. Obtain one from InferenceServer.client()
+        and hand it to worker processes when they are created, e.g. through Pool initargs.
+        Each process claims its own response queue on its first call.
+        predict raises a RuntimeError when the server reports an error or stops responding.
+        """
+        self.requests = requests
+        self.responses = responses
+        self.next_slot = next_slot
+        self.stats = stats
+        self.timeout = timeout
+        self.slot = None
+        self._pid = None
+        self._request_id = 0
+
+    def _claim_slot(self):
+        with self.next_slot.get_lock():
+            slot = self.next_slot.value
+            self.next_slot.value += 1
+        if slot >= len(self.responses):
+            raise RuntimeError(f'All {len(self.responses)} client slots of the inference server are taken')
+        self.slot = slot
+        self._pid = os.getpid()
+
+    def predict(self, x):
+        # Copies of a client inherited by another process claim a slot of their own
+        if self._pid != os.getpid():
+            self._claim_slot()
+
+        self._request_id += 1
+        self.requests.put((self.slot, self._request_id, time.monotonic(), np.asarray(x, dtype=np.float32)))
+        request_id, out, error = self._receive()
+        if error is not None:
+            raise RuntimeError(error)
+        if request_id != self._request_id:
+            raise RuntimeError(f'Expected response {self._request_id} from the inference server. Received {request_id}')
+        return out
+
+    def _receive(self):
+        """Waits for the response, checking between polls that the server is still alive"""
+        while True:
+            try:
+                return self.responses[self.slot].get(timeout=_HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                silent = time.monotonic() - self.stats[_HEARTBEAT]
+                if silent > self.timeout:
+                    raise RuntimeError(f'Inference server has not responded for {silent:.1f} s')
+
+
+class InferenceServer:
+    def __init__(self, model_path='model.h5', max_batch=256, max_latency=0.002, clients=64, dtype=np.float32,
+                 timeout=30.0):
+        """
+        :param model_path: model.h5 or weights exported by nn_numpy, see evaluator.load_evaluator
+        :param max_batch: Rows after which a batch is run without waiting further
+        :param max_latency: Seconds a request waits at most for other requests to join its batch
+        :param clients: Number of processes that can connect
+        :param dtype: float32 or float16 for NumPy weights
+        :param timeout: Seconds without a sign of life from the server after which clients give up waiting.
+        The server shows none while running a batch, so keep it above the time of the largest batch
+        """
+        if max_batch < 1:
+            raise ValueError(f'Expected max_batch of at least 1. Received {max_batch}')
+
+        self.model_path = model_path
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.dtype = dtype
+        self.timeout = timeout
+        self.requests = Queue()
+        self.responses = [Queue() for _ in range(clients)]
+        self.next_slot = Value('i', 0)
+        self.stats = RawArray('d', 8)
+        self._process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def start(self):
+        self.stats[_HEARTBEAT] = time.monotonic()
+        self._process = Process(target=_serve, daemon=True,
+                                args=(self.model_path, self.dtype, self.requests, self.responses, self.stats,
+                                      self.max_batch, self.max_latency))
+        self._process.start()
+        logger.info(f'Started inference server for {self.model_path} (pid {self._process.pid})')
+
+    def close(self):
+        if self._process is not None:
+            self.requests.put(None)
+            self._process.join()
+            self._process = None
+            logger.info(self)
+
+    def client(self) -> InferenceClient:
+        return InferenceClient(self.requests, self.responses, self.next_slot, self.stats, self.timeout)
+
+    def metrics(self) -> dict:
+        requests = self.stats[_REQUESTS]
+        batches = self.stats[_BATCHES]
+        return {
+            'requests': int(requests),
+            'batches': int(batches),
+            'mean_batch_rows': self.stats[_ROWS] / batches if batches else 0.0,
+            'mean_requests_per_batch': requests / batches if batches else 0.0,
+            'mean_latency_ms': 1000 * self.stats[_LATENCY_SUM] / requests if requests else 0.0,
+            'max_latency_ms': 1000 * self.stats[_LATENCY_MAX],
+            'queue_depth': int(self.stats[_DEPTH]),
+            'max_queue_depth': int(self.stats[_DEPTH_MAX]),
+        }
+
+    def __repr__(self):
+        m = self.metrics()
+        return f'InferenceServer(requests={m["requests"]}, batches={m["batches"]}, ' \
+               f'mean_batch_rows={m["mean_batch_rows"]:.1f}, mean_latency={m["mean_latency_ms"]:.2f} ms, ' \
+               f'max_latency={m["max_latency_ms"]:.2f} ms, max_queue_depth={m["max_queue_depth"]})'
@@ -1,77 +1,216 @@
+from src.othello import bitops
 from src.othello.game_logic import GameBoard, Move
+from src.othello.position import Position
 from src.core.logger import logger
-from copy import deepcopy
+from src.ai import eval_cache as ec, rollout
+from src.ai.transposition import NodeStats, TranspositionTable
+from src.ai.selection import SelectionPolicy, UCT
+from multiprocessing import Pool
+import math
 import numpy as np
 import random
+import time
+
+DEFAULT_SELECTION = UCT()
+
 
 class MCTSNode:
-    def __init__(self, board: GameBoard, parent=None, move=None):
-        self.board = board
+    def __init__(self, position: Position, parent=None, square=None, stats: NodeStats = None, prior=1.0):
+        self.position = position
         self.parent = parent
-        self.move = move
+        self.square = square
+        self.prior = prior  # Used by PUCT selection
         self.children = []
-        self.visits = 0
-        self.wins = 0
-        self.untried_moves = board.legal_moves(board.current_player)
+        self.stats = stats if stats is not None else NodeStats()  # Shared between transpositions
+        self.untried_moves = position.legal_mask()  # Mask of squares without a child yet
+        self._log_visits = 0.0
+        self._log_visits_n = 0
+
+    @property
+    def visits(self):
+        return self.stats.visits
+
+    @property
+    def wins(self):
+        return self.stats.wins
+
+    @property
+    def move(self) -> Move | None:
+        """The move leading to this node. Move objects are only built on request, e.g. for display."""
+        if self.square is None or self.parent is None:
+            return None
+        return Move(self.parent.position.current_player, self.square)
 
     def is_fully_expanded(self):
-        return len(self.untried_moves) == 0
+        return self.untried_moves == 0
 
     def is_terminal_node(self):
-        return self.board.is_game_complete() or self.board.legal_moves(self.board.current_player) == 0
+        return self.position.is_game_complete()
 
-    def uct_select_child(self):
-        s = sorted(self.children, key=lambda c: c.wins / c.visits + np.sqrt(2 * np.log(self.visits) / c.visits))[-1]
-        return s
+    def log_visits(self) -> float:
+        """ln(visits), recomputed only when visits changed since the last call"""
+        visits = self.stats.visits
+        if visits != self._log_visits_n:
+            self._log_visits = math.log(visits) if visits > 0 else 0.0
+            self._log_visits_n = visits
+        return self._log_visits
 
-    def add_child(self, m, board):
-        n = MCTSNode(board, parent=self, move=m)
-        self.untried_moves.remove(m)
+    def uct_select_child(self, policy: SelectionPolicy = DEFAULT_SELECTION):
+        return policy.select(self)
+
+    def add_child(self, square, position, stats: NodeStats = None, prior=1.0):
+        n = MCTSNode(position, parent=self, square=square, stats=stats, prior=prior)
+        self.untried_moves &= ~(1 << square)
         self.children.append(n)
         return n
 
-    def update(self, result):
-        self.visits += 1
-        self.wins += result
-
-    def rollout(self, search_initiator_color: int):
-        board_copy: GameBoard = deepcopy(self.board)
-        while not board_copy.is_game_complete():
-            legal_moves_cur = board_copy.legal_moves(board_copy.current_player)
-            if len(legal_moves_cur) > 1:
-                # Cur can play
-                board_copy.apply_move(random.choice(legal_moves_cur))
-            elif len(legal_moves_cur) == 1:
-                board_copy.apply_move(legal_moves_cur[0])
+    def update(self, result, visits=1):
+        self.stats.visits += visits
+        self.stats.wins += result
+
+    def add_virtual_loss(self, n):
+        """Counts n pending visits as losses, steering concurrent descents elsewhere until they are backed up"""
+        self.stats.visits += n
+
+    def remove_virtual_loss(self, n):
+        self.stats.visits -= n
+
+    def apply_virtual_loss(self, n):
+        """Adds n virtual loss to this node and all its ancestors, or removes -n when n is negative"""
+        node = self
+        while node is not None:
+            if n > 0:
+                node.add_virtual_loss(n)
             else:
-                board_copy.apply_pass()
+                node.remove_virtual_loss(-n)
+            node = node.parent
+
+    def rollout(self, search_initiator_color: int, cache=None):
+        """
+        :param cache: Optional EvalCache or SharedEvalCache serving repeated positions
+        """
+        if cache is not None:
+            return cache.rollout(self.position, search_initiator_color)
+        return rollout.random_rollout(self.position, search_initiator_color)
 
-        cur_count = board_copy.get_bitboard(search_initiator_color).bitcount()
-        opp_count = board_copy.get_bitboard(-search_initiator_color).bitcount()
-        if cur_count > opp_count:
-            return 1
-        return 0
+    def rollout_batch(self, search_initiator_color: int, k: int, rng: np.random.Generator = None):
+        """
+        Runs k random rollouts of this node in lockstep.
+        :return: Number of rollouts won by search_initiator_color
+        """
+        p = np.full(k, self.position.player_bits, dtype=np.uint64)
+        o = np.full(k, self.position.opp_bits, dtype=np.uint64)
+
+        # Lanes always start with the side to move. Differentials are from its perspective
+        diffs = rollout.random_rollouts(p, o, rng)
+        if self.position.current_player == search_initiator_color:
+            return int((diffs > 0).sum())
+        return int((diffs < 0).sum())
 
     def __repr__(self):
         return f"Move: {self.move} | Wins: {self.wins} | Visits: {self.visits} ({(self.wins / self.visits) * 100:.2f}%)"
 
 
+def _root_parallel_worker(position: Position, iter_max, time_limit, rollout_batch, selection, seed):
+    """
+    Runs one independent search for root-parallel MCTS and returns (square, visits, wins) per root child.
+    Uses the SharedEvalCache installed in this worker, if any.
+    """
+    random.seed(seed)
+    rollout.seed(seed)
+    mcts = MCTS(position, iter_max=iter_max, rollout_batch=rollout_batch, selection=selection,
+                eval_cache=ec.installed())
+    mcts.search(time_limit=time_limit)
+    return [(c.square, c.visits, c.wins) for c in mcts.root.children]
+
+
 class MCTS:
-    def __init__(self, board: GameBoard, iter_max=100, verbose=False):
-        self.root = MCTSNode(board)
+    # Iterations between checks for stopping a timed search early
+    EARLY_STOP_INTERVAL = 16
+
+    def __init__(self, position: Position | GameBoard, iter_max=100, verbose=False, rollout_batch=1,
+                 transposition_table: TranspositionTable = None, workers=1, selection: SelectionPolicy = None,
+                 eval_cache=None):
+        """
+        :param position: Position to search from. GameBoards are converted to a Position
+        :param iter_max: Number of iterations (leaf evaluations) per search. May be None when
+        searches are given a time_limit instead
+        :param verbose: Whether to log the root children after searching
+        :param rollout_batch: Random rollouts run in lockstep per leaf. Values above 1
+        evaluate each leaf with the vectorized rollout engine (leaf parallelism).
+        :param transposition_table: Optional table through which nodes holding the same
+        position share their visits and wins
+        :param workers: Processes searching in parallel from the root (root parallelism). Each runs
+        iter_max iterations with its own seed and the root children statistics are merged.
+        Call close() to shut the worker pool down when done. Workers use the same selection policy
+        and eval_cache, which must then be a SharedEvalCache. A transposition table cannot be combined with workers.
+        :param selection: Child selection policy, defaults to UCT with exploration sqrt(2)
+        :param eval_cache: Optional EvalCache or SharedEvalCache in front of single rollouts
+        (rollout_batch of 1), averaging repeated positions instead of rolling them out again
+        """
+        if workers > 1 and transposition_table is not None:
+            raise ValueError('A transposition table cannot be shared by root-parallel workers. Use workers=1')
+        if workers > 1 and eval_cache is not None and not isinstance(eval_cache, ec.SharedEvalCache):
+            raise ValueError(f'Root-parallel workers need a SharedEvalCache. Received {type(eval_cache).__name__}')
+
+        if isinstance(position, GameBoard):
+            position = Position.from_board(position)
+
+        self.tt = transposition_table
+        self.root = MCTSNode(position, stats=self._stats_for(position))
         self.iter_max = iter_max
         self.verbose = verbose
+        self.rollout_batch = rollout_batch
+        self.workers = workers
+        self._pool = None
+        self.selection = selection if selection is not None else DEFAULT_SELECTION
+        self.eval_cache = eval_cache
 
-    def search(self, return_nodes=False) -> Move | list[MCTSNode]:
-        for i in range(self.iter_max):
+    def _stats_for(self, position: Position) -> NodeStats | None:
+        if self.tt is None:
+            return None
+        return self.tt.get_or_create(position)
+
+    def search(self, return_nodes=False, time_limit: float = None) -> Move | list[MCTSNode]:
+        """
+        :param return_nodes: Return the root children sorted by visits instead of the best move
+        :param time_limit: Wall-clock seconds to search for. iter_max still caps the iterations when set.
+        A timed search also stops once the most visited root child can no longer be overtaken.
+        """
+        if self.iter_max is None and time_limit is None:
+            raise ValueError('Either iter_max or time_limit must be set')
+
+        if self.workers > 1:
+            self._search_root_parallel(time_limit)
+            return self._result(return_nodes)
+
+        iter_max = self.iter_max if self.iter_max is not None else float('inf')
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit is not None else None
+
+        i = 0
+        while i < iter_max:
             node = self.tree_policy(self.root)
-            initiation_color = self.root.children[0].move.color
-            result = node.rollout(initiation_color)
-            self.backup(node, result)
+            initiation_color = self.root.position.current_player
+            result, visits = self.evaluate(node, initiation_color)
+            self.backup(node, result, visits)
+            i += 1
 
+            if deadline is not None:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                if i % self.EARLY_STOP_INTERVAL == 0 and self._decided(i, iter_max, start, now, deadline):
+                    break
+
+        return self._result(return_nodes)
+
+    def _result(self, return_nodes):
         if self.verbose:
             for c in sorted(self.root.children, key=lambda c: c.visits):
                 logger.info(c)
+            if self.tt is not None:
+                logger.info(self.tt)
 
         # Return the most positive move for white, most negative move for black
         s = sorted(self.root.children, key=lambda c: c.visits, reverse=True)
@@ -81,26 +220,98 @@ class MCTS:
 
         return s[0].move
 
+    def _search_root_parallel(self, time_limit):
+        """Runs one independent search per worker from the root and merges their root children into the tree"""
+        if self._pool is None:
+            self._pool = Pool(processes=self.workers, initializer=ec.install, initargs=(self.eval_cache,))
+
+        base_seed = random.getrandbits(32)
+        args = [(self.root.position, self.iter_max, time_limit, self.rollout_batch, self.selection, base_seed + w)
+                for w in range(self.workers)]
+
+        children = {c.square: c for c in self.root.children}
+        for stats in self._pool.starmap(_root_parallel_worker, args):
+            for square, visits, wins in stats:
+                child = children.get(square)
+                if child is None:
+                    position = self.root.position.play(square)
+                    child = self.root.add_child(square, position, self._stats_for(position))
+                    children[square] = child
+                child.update(wins, visits)
+                self.root.update(wins, visits)
+
+    def close(self):
+        """Shuts down the root-parallel worker pool, if one was started"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def _decided(self, i, iter_max, start, now, deadline) -> bool:
+        """Whether the most visited root child stays on top even if every remaining visit went to the runner-up"""
+        if self.root.untried_moves:
+            return False
+        if len(self.root.children) <= 1:
+            return True
+
+        visits = sorted((c.visits for c in self.root.children), reverse=True)
+        visits_per_second = i * self.rollout_batch / (now - start)
+        remaining = min((deadline - now) * visits_per_second, (iter_max - i) * self.rollout_batch)
+        return visits[0] - visits[1] > remaining
+
+    def advance(self, move: Move | int | None = None) -> MCTSNode:
+        """
+        Moves the root to the position after the given move, keeping the subtree (visits and wins)
+        already searched below it. The rest of the tree is released.
+        Trees should only be advanced and searched for one color, since wins are counted for the
+        color to move at the root when searching.
+        :param move: Move or square played from the current root, by either color. None for a pass
+        :return: The new root
+        """
+        if move is None:
+            position = self.root.position.pass_move()
+            square = None
+        else:
+            square = move.pos if isinstance(move, Move) else move
+            position = self.root.position.play(square)
+
+        for child in self.root.children:
+            if square is not None and child.square == square:
+                child.parent = None
+                self.root = child
+                return child
+
+        self.root = MCTSNode(position, stats=self._stats_for(position))
+        return self.root
+
     def tree_policy(self, node: MCTSNode):
         while not node.is_terminal_node():
             if not node.is_fully_expanded():
                 return self.expand(node)
             else:
                 if len(node.children) == 0:
-                    result = node.rollout(self.root.children[0].move.color)
-                    self.backup(node, result)
+                    result, visits = self.evaluate(node, self.root.position.current_player)
+                    self.backup(node, result, visits)
                     return node
                 else:
-                    node = node.uct_select_child()
+                    node = node.uct_select_child(self.selection)
         return node
 
     def expand(self, node: MCTSNode):
-        m = random.choice(node.untried_moves)
-        board_copy: GameBoard = deepcopy(node.board)
-        board_copy.apply_move(m)
-        return node.add_child(m, board_copy)
+        square = bitops.random_square(node.untried_moves)
+        position = node.position.play(square)
+        return node.add_child(square, position, self._stats_for(position))
+
+    def evaluate(self, node: MCTSNode, initiation_color: int):
+        """
+        Rolls out the given leaf.
+        :return: (wins, visits) to back up through the tree
+        """
+        if self.rollout_batch > 1:
+            return node.rollout_batch(initiation_color, self.rollout_batch), self.rollout_batch
+        return node.rollout(initiation_color, self.eval_cache), 1
 
-    def backup(self, node: MCTSNode, result):
+    def backup(self, node: MCTSNode, result, visits=1):
         while node is not None:
-            node.update(result)
-            node = node.parent
\ No newline at end of file
+            node.update(result, visits)
+            node = node.parent
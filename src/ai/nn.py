@@ -1,45 +1,44 @@
 import tensorflow as tf
 import numpy as np
 import pprint
+from pathlib import Path
 
 from src.core.logger import logger
+from src.ai import dataset, features, records, shards
 from src.ai.state_save import StateSaveDecoder
 from sklearn.model_selection import train_test_split
 
 
 def load_data():
+    """Saved states as dicts, from the record file written by self-play or else from the JSON store"""
+    if Path(shards.DATA_PATH).exists():
+        return [records.to_state_dict(r) for r in records.load(shards.DATA_PATH)]
+
     decoder = StateSaveDecoder()
     return decoder.data
 
 # convert np.uint64 to array of 64 bits
 def bits_to_array(bits: np.uint64) -> np.ndarray:
-    return np.array([int(b) for b in bin(bits)[2:].zfill(64)], dtype=np.uint64)
-
-
-def sanitize_data():
-    data = load_data()
-    bits_black = np.array([bits_to_array(np.uint64(data[i]['bits_black'])) for i in range(len(data))])
-    bits_white = np.array([bits_to_array(np.uint64(data[i]['bits_white'])) for i in range(len(data))])
-    current_player = np.array([data[i]['current_player'] for i in range(len(data))], dtype=np.int8)
-    results = [data[i]['results'] for i in range(len(data))]
+    return features.unpack_bits(np.array([bits], dtype=np.uint64))[0].astype(np.uint64)
 
-    x_train = np.column_stack((bits_black, bits_white, current_player))
-    y_train = np.zeros((len(results), 64))
 
-    for i in range(len(results)):
-        for r in results[i]:
-            move = int(list(r.keys())[0])
-            ratio = float(r[str(move)]['ratio'])
-            y_train[i][move] = ratio
+def sanitize_data(canonical=True):
+    """
+    :param canonical: Bring every position into its symmetry.canonical form, moving the targets
+    along, and merge positions that turn out identical. Symmetric positions then make up one sample.
+    """
+    if Path(shards.DATA_PATH).exists():
+        x_train, y_train = features.load_dataset(shards.DATA_PATH, canonical)
+    else:
+        x_train, y_train = features.featurize(records.from_states(load_data() or []), canonical)
+    logger.info(f'{len(x_train)} samples')
 
     x_train, x_test, y_train, y_test = train_test_split(x_train, y_train,
                                                         test_size=0.2, random_state=42)
 
     return x_train, x_test, y_train, y_test
 
-def train():
-    x_train, x_test, y_train, y_test = sanitize_data()
-
+def build_model():
     model = tf.keras.Sequential([
         tf.keras.layers.Flatten(input_shape=(129,)),
         tf.keras.layers.Dense(128, activation='relu'),
@@ -49,9 +48,28 @@ def train():
     ])
 
     model.compile(optimizer='adam', loss='mean_squared_error', metrics=['accuracy'])
-    model.fit(x_train, y_train, epochs=8000)
-
-    test_loss, test_acc = model.evaluate(x_test, y_test, verbose=2)
+    return model
+
+
+def train(streaming=False, epochs=8000, batch_size=256):
+    """
+    :param streaming: Stream batches from the record files through dataset.RecordStream, with shuffling,
+    random symmetry augmentation and prefetching, instead of loading the whole dataset into memory.
+    The test split is picked by position hash instead of train_test_split.
+    :param epochs: Training epochs
+    :param batch_size: Samples per batch when streaming
+    """
+    model = build_model()
+
+    if streaming:
+        train_data = dataset.RecordStream(batch_size=batch_size, split='train')
+        test_data = dataset.RecordStream(batch_size=batch_size, split='test', augment=False, shuffle_buffer=0)
+        model.fit(train_data.as_tf_dataset(), epochs=epochs)
+        test_loss, test_acc = model.evaluate(test_data.as_tf_dataset(), verbose=2)
+    else:
+        x_train, x_test, y_train, y_test = sanitize_data()
+        model.fit(x_train, y_train, epochs=epochs)
+        test_loss, test_acc = model.evaluate(x_test, y_test, verbose=2)
 
     logger.info(f'Test accuracy: {test_acc}, Test loss: {test_loss}')
 
@@ -0,0 +1,133 @@
+import time
+
+from src.ai.evaluator import Evaluator
+from src.ai.mcts import MCTS, MCTSNode
+from src.ai.selection import SelectionPolicy, PUCT
+from src.othello import bitops
+from src.othello.game_logic import GameBoard, Move
+from src.othello.position import Position
+
+
+class NNMCTS(MCTS):
+    def __init__(self, position: Position | GameBoard, evaluator: Evaluator, iter_max=100, verbose=False,
+                 batch_size=32, rollout_mix=0.0, virtual_loss=1, selection: SelectionPolicy = None,
+                 eval_cache=None):
+        """
+        PUCT search that evaluates leaves with the policy network instead of (or next to) random rollouts.
+        Leaves are gathered in batches: each descent adds virtual loss to its path so the next one
+        picks a different leaf, and the whole batch is evaluated with a single predict call.
+        An evaluated leaf gets all its children at once, each with the network prior of its move.
+        Unlike MCTS, wins are counted for the color that moved into a node, so every level of the
+        tree picks the best move for the color to move there.
+        :param evaluator: Evaluator computing priors and values, e.g. KerasEvaluator
+        :param iter_max: Number of leaf evaluations per search. May be None when searches are given a time_limit
+        :param batch_size: Maximum number of leaves per predict call
+        :param rollout_mix: Weight of a random rollout in the leaf value, from 0 (network value only)
+        to 1 (rollout only, the network then only supplies priors)
+        :param virtual_loss: Visits counted as losses per pending descent. Must be at least 1
+        :param selection: Child selection policy, defaults to PUCT
+        :param eval_cache: Optional EvalCache or SharedEvalCache for the rollouts mixed into leaf values.
+        Wrap the evaluator in a CachedEvaluator to cache network evaluations.
+        """
+        if batch_size < 1:
+            raise ValueError(f'Expected a batch size of at least 1. Received {batch_size}')
+        if not 0.0 <= rollout_mix <= 1.0:
+            raise ValueError(f'Expected rollout_mix between 0 and 1. Received {rollout_mix}')
+        if virtual_loss < 1:
+            raise ValueError(f'Expected a virtual loss of at least 1. Received {virtual_loss}')
+
+        super().__init__(position, iter_max=iter_max, verbose=verbose,
+                         selection=selection if selection is not None else PUCT(), eval_cache=eval_cache)
+        self.evaluator = evaluator
+        self.batch_size = batch_size
+        self.rollout_mix = rollout_mix
+        self.virtual_loss = virtual_loss
+
+    def search(self, return_nodes=False, time_limit: float = None) -> Move | list[MCTSNode]:
+        if self.iter_max is None and time_limit is None:
+            raise ValueError('Either iter_max or time_limit must be set')
+
+        iter_max = self.iter_max if self.iter_max is not None else float('inf')
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit is not None else None
+
+        i = 0
+        while i < iter_max:
+            i += self._search_batch(int(min(self.batch_size, iter_max - i)))
+
+            if deadline is not None:
+                now = time.perf_counter()
+                if now >= deadline or self._decided(i, iter_max, start, now, deadline):
+                    break
+
+        return self._result(return_nodes)
+
+    def _search_batch(self, n: int) -> int:
+        """
+        Runs up to n descents and evaluates their leaves together. Gathering stops early when a
+        descent reaches a leaf that is already pending.
+        :return: Number of leaves evaluated
+        """
+        leaves = []
+        pending = set()
+        done = 0
+
+        for _ in range(n):
+            node = self.tree_policy(self.root)
+            if node.is_terminal_node():
+                self.backup(node, self._terminal_value(node.position))
+                done += 1
+                continue
+            if id(node) in pending:
+                break
+
+            node.apply_virtual_loss(self.virtual_loss)
+            pending.add(id(node))
+            leaves.append(node)
+
+        if not leaves:
+            return done
+
+        priors, values = self.evaluator.evaluate([leaf.position for leaf in leaves])
+        for leaf, prior, value in zip(leaves, priors, values):
+            leaf.apply_virtual_loss(-self.virtual_loss)
+            self._expand_all(leaf, prior)
+            self.backup(leaf, self._leaf_value(leaf, float(value)))
+
+        return done + len(leaves)
+
+    def tree_policy(self, node: MCTSNode):
+        while node.children:
+            node = node.uct_select_child(self.selection)
+        return node
+
+    def _expand_all(self, node: MCTSNode, priors):
+        """Adds every child of the node, or a single pass child when the color to move has no legal move"""
+        if node.untried_moves == 0:
+            node.children.append(MCTSNode(node.position.pass_move(), parent=node))
+            return
+
+        for square in bitops.iter_squares(node.untried_moves):
+            node.add_child(square, node.position.play(square), prior=float(priors[square]))
+
+    def _leaf_value(self, node: MCTSNode, value: float) -> float:
+        if self.rollout_mix > 0:
+            value += self.rollout_mix * (node.rollout(node.position.current_player, self.eval_cache) - value)
+        return value
+
+    @staticmethod
+    def _terminal_value(position: Position) -> float:
+        winner = position.winner()
+        if winner == position.current_player:
+            return 1.0
+        return 0.0 if winner == -position.current_player else 0.5
+
+    def backup(self, node: MCTSNode, value, visits=1):
+        """
+        :param value: Win probability of the color to move at node
+        """
+        color = node.position.current_player
+        while node is not None:
+            mover = node.parent.position.current_player if node.parent is not None else -node.position.current_player
+            node.update(value if mover == color else 1.0 - value, visits)
+            node = node.parent
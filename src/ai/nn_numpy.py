@@ -0,0 +1,116 @@
+import json
+
+import numpy as np
+
+from src.core.logger import logger
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0, out=x),
+    # 0.5 * (1 + tanh(x / 2)) equals the logistic function without overflowing in exp
+    'sigmoid': lambda x: 0.5 * (1 + np.tanh(0.5 * x)),
+    'tanh': np.tanh,
+}
+
+DTYPES = (np.float32, np.float16)
+
+
+def _check_dtype(dtype):
+    if np.dtype(dtype) not in [np.dtype(d) for d in DTYPES]:
+        raise ValueError(f'Expected dtype float32 or float16. Received {np.dtype(dtype)}')
+
+
+def export_weights(model_path='model.h5', out_path='model.npz', dtype=np.float32) -> str:
+    """
+    Copies the Dense layers of a Keras model saved by nn.train into a .npz file, without TensorFlow.
+    Flatten and InputLayer layers are skipped since the network takes flat inputs.
+    :param model_path: Keras HDF5 model
+    :param out_path: Destination of the weights
+    :param dtype: float32 or float16. float16 halves the file size.
+    :return: out_path
+    """
+    import h5py
+    _check_dtype(dtype)
+
+    arrays = {}
+    activations = []
+    with h5py.File(model_path, 'r') as f:
+        config = json.loads(f.attrs['model_config'])
+        weights = f['model_weights']
+
+        for layer in config['config']['layers']:
+            if layer['class_name'] in ('InputLayer', 'Flatten'):
+                continue
+            if layer['class_name'] != 'Dense':
+                raise ValueError(f'Unsupported layer {layer["class_name"]} in {model_path}')
+
+            name = layer['config']['name']
+            activation = layer['config']['activation']
+            if activation not in ACTIVATIONS:
+                raise ValueError(f'Unsupported activation {activation} in layer {name}')
+
+            i = len(activations)
+            group = weights[name][name]
+            arrays[f'kernel_{i}'] = group['kernel:0'][()].astype(dtype)
+            bias = group['bias:0'][()] if 'bias:0' in group else np.zeros(arrays[f'kernel_{i}'].shape[1])
+            arrays[f'bias_{i}'] = bias.astype(dtype)
+            activations.append(activation)
+
+    np.savez(out_path, activations=np.array(activations), **arrays)
+    logger.info(f'Exported {len(activations)} layers from {model_path} to {out_path}')
+    return out_path
+
+
+class NumpyNetwork:
+    def __init__(self, path='model.npz', dtype=np.float32):
+        """
+        Forward pass of a network exported by export_weights in plain NumPy.
+        :param path: .npz file written by export_weights
+        :param dtype: float32 or float16 to run the layers in. float16 halves the memory used by the
+        weights, but NumPy has no BLAS kernels for it, so float32 is faster for large batches.
+        """
+        _check_dtype(dtype)
+        self.dtype = np.dtype(dtype)
+
+        with np.load(path) as data:
+            self.activations = [str(a) for a in data['activations']]
+            self.layers = [(data[f'kernel_{i}'].astype(dtype), data[f'bias_{i}'].astype(dtype))
+                           for i in range(len(self.activations))]
+
+    def __repr__(self):
+        shapes = ' -> '.join(str(k.shape[0]) for k, _ in self.layers)
+        return f'NumpyNetwork({shapes} -> {self.output_size}, dtype={self.dtype})'
+
+    @property
+    def input_size(self) -> int:
+        return self.layers[0][0].shape[0]
+
+    @property
+    def output_size(self) -> int:
+        return self.layers[-1][0].shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(k.nbytes + b.nbytes for k, b in self.layers)
+
+    def predict(self, x: np.ndarray, batch_size: int = None) -> np.ndarray:
+        """
+        :param x: Inputs of shape (N, input_size)
+        :param batch_size: Rows per forward pass. None runs all rows at once
+        :return: float32 outputs of shape (N, output_size)
+        """
+        x = np.asarray(x, dtype=self.dtype).reshape(-1, self.input_size)
+        if batch_size is None or batch_size >= len(x):
+            return self._forward(x)
+
+        out = np.empty((len(x), self.output_size), dtype=np.float32)
+        for start in range(0, len(x), batch_size):
+            out[start:start + batch_size] = self._forward(x[start:start + batch_size])
+        return out
+
+    def _forward(self, x: np.ndarray) -> np.ndarray:
+        for (kernel, bias), activation in zip(self.layers, self.activations):
+            x = x @ kernel
+            x += bias
+            x = ACTIVATIONS[activation](x)
+        return x.astype(np.float32, copy=False)
@@ -0,0 +1,216 @@
+"""
+Continuous self-play, training and gating.
+
+Each generation, self-play workers play games with the best network and stream the searched
+positions to shards. While they play, the trainer fits a candidate network on the samples
+gathered so far. The candidate then plays a gating match against the best network and is
+promoted when a sequential probability ratio test finds it stronger. Every stage reports its throughput.
+"""
+import os
+import random
+import time
+from dataclasses import dataclass
+from multiprocessing import Pool
+from pathlib import Path
+
+from src.ai import nn_numpy, records, rollout, shards
+from src.ai.arena import Arena, NNAgent, SPRT
+from src.ai.evaluator import NumpyEvaluator
+from src.ai.nn_mcts import NNMCTS
+from src.ai.state_save import SavedMoveData, StateSave
+from src.core.logger import logger
+from src.othello.position import Position
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    seconds: float = 0.0
+    games: int = 0
+    samples: int = 0
+    evaluations: int = 0
+
+    def add(self, seconds=0.0, games=0, samples=0, evaluations=0):
+        self.seconds += seconds
+        self.games += games
+        self.samples += samples
+        self.evaluations += evaluations
+
+    def __str__(self):
+        s = max(self.seconds, 1e-9)
+        return f'{self.name}: {self.games * 3600 / s:.1f} games/h, {self.samples / s:.1f} samples/s, ' \
+               f'{self.evaluations / s:.1f} evals/s ({self.seconds:.1f} s)'
+
+
+def _seed(seed):
+    random.seed(seed)
+    rollout.seed(seed)
+
+
+def _pick(children, temperature_moves: int, move_count: int):
+    """Most visited child, or a child drawn by visit count during the first temperature_moves moves"""
+    if move_count >= temperature_moves:
+        return children[0]
+    return random.choices(children, weights=[c.visits for c in children])[0]
+
+
+def _self_play_worker(weights_path, games, iters, batch_size, temperature_moves, worker_id, directory, seed):
+    """Plays games of the network against itself and streams every search to shard worker_id"""
+    _seed(seed)
+    evaluator = NumpyEvaluator(weights_path)
+    samples = evaluations = 0
+
+    with shards.ShardWriter(directory, worker_id) as writer:
+        for _ in range(games):
+            position = Position()
+            mcts = NNMCTS(position, evaluator, iter_max=iters, batch_size=batch_size)
+            move_count = 0
+
+            while not position.is_game_complete():
+                if position.legal_mask() == 0:
+                    position = position.pass_move()
+                    mcts.advance(None)
+                    continue
+
+                visits = mcts.root.visits
+                children = mcts.search(return_nodes=True)
+                evaluations += mcts.root.visits - visits
+
+                saves = [SavedMoveData(c.square, c.move.pos_to_str(), c.wins, c.visits, c.wins / c.visits)
+                         for c in children if c.visits > 0]
+                writer.write(StateSave(position.black, position.white, position.current_player, saves))
+                samples += 1
+
+                square = _pick(children, temperature_moves, move_count).square
+                position = position.play(square)
+                mcts.advance(square)
+                move_count += 1
+
+    return games, samples, evaluations
+
+
+class Pipeline:
+    def __init__(self, workers=None, games_per_worker=4, iters=200, batch_size=16, temperature_moves=10,
+                 train_epochs=4, train_batch_size=256, gate_games=400, gate_iters=100, gate_sprt: SPRT = None,
+                 best_path='model.h5', candidate_path='candidate.h5', directory=shards.SHARD_DIR,
+                 data_path=shards.DATA_PATH):
+        """
+        :param workers: Self-play and gating processes, all CPUs by default
+        :param games_per_worker: Self-play games per worker and generation
+        :param iters: NNMCTS leaf evaluations per self-play move
+        :param batch_size: Leaves per network call in NNMCTS
+        :param temperature_moves: Opening moves drawn by visit count instead of played greedily
+        :param train_epochs: Epochs over the samples per generation
+        :param train_batch_size: Samples per training batch
+        :param gate_games: Most games between candidate and best network per generation, played in the Arena
+        :param gate_iters: NNMCTS leaf evaluations per gating move
+        :param gate_sprt: Test ending the gating match. The candidate is promoted when it accepts elo1, or when
+        the match runs out of games undecided with the lower Wilson bound of its score above 0.5.
+        Defaults to SPRT(0, 35)
+        :param best_path: Best network. Its weights are exported next to it as .npz for the workers.
+        A freshly initialized network is saved there when it does not exist
+        :param candidate_path: Where the trainer saves the candidate
+        """
+        self.workers = workers or os.cpu_count()
+        self.games_per_worker = games_per_worker
+        self.iters = iters
+        self.batch_size = batch_size
+        self.temperature_moves = temperature_moves
+        self.train_epochs = train_epochs
+        self.train_batch_size = train_batch_size
+        self.gate_games = gate_games
+        self.gate_iters = gate_iters
+        self.gate_sprt = gate_sprt if gate_sprt is not None else SPRT(0, 35)
+        self.best_path = Path(best_path)
+        self.candidate_path = Path(candidate_path)
+        self.directory = directory
+        self.data_path = data_path
+        self.generation = 0
+        self.metrics = {name: StageMetrics(name) for name in ('self-play', 'train', 'gate')}
+
+    @staticmethod
+    def weights_path(model_path: Path) -> Path:
+        return model_path.with_suffix('.npz')
+
+    def run(self, generations=None):
+        """
+        Runs generations until the given count, forever when None.
+        Self-play of a generation overlaps training on the samples of the previous ones.
+        """
+        best_weights = self.weights_path(self.best_path)
+        if not self.best_path.exists():
+            self._bootstrap()
+        if not best_weights.exists():
+            nn_numpy.export_weights(str(self.best_path), str(best_weights))
+
+        with Pool(self.workers) as pool:
+            while generations is None or self.generation < generations:
+                self.generation += 1
+                logger.info(f'Generation {self.generation}')
+
+                start = time.perf_counter()
+                self_play = self._start_self_play(pool, best_weights)
+                if Path(self.data_path).exists() and records.count(self.data_path) > 0:
+                    self._train()
+                played = self_play.get()
+                self.metrics['self-play'].add(time.perf_counter() - start, *map(sum, zip(*played)))
+
+                shards.compact(self.directory, self.data_path)
+                if self.candidate_path.exists():
+                    self._gate(pool)
+
+                self.report()
+
+    def _start_self_play(self, pool, weights_path):
+        base_seed = random.getrandbits(32)
+        args = [(str(weights_path), self.games_per_worker, self.iters, self.batch_size, self.temperature_moves,
+                 w, self.directory, base_seed + w) for w in range(self.workers)]
+        return pool.starmap_async(_self_play_worker, args)
+
+    def _bootstrap(self):
+        """Saves a freshly initialized network as the best one, replacing weights exported from an older one"""
+        from src.ai import nn
+
+        nn.build_model().save(self.best_path)
+        nn_numpy.export_weights(str(self.best_path), str(self.weights_path(self.best_path)))
+        logger.info(f'Initialized {self.best_path} with a new network')
+
+    def _train(self):
+        """Fits a candidate, starting from the best network, on the samples compacted so far"""
+        import tensorflow as tf
+        from src.ai import dataset
+
+        model = tf.keras.models.load_model(self.best_path)
+        stream = dataset.RecordStream([self.data_path], batch_size=self.train_batch_size, split='train')
+        samples = len(stream) * self.train_batch_size * self.train_epochs
+
+        start = time.perf_counter()
+        model.fit(stream.as_tf_dataset(), epochs=self.train_epochs, verbose=0)
+        model.save(self.candidate_path)
+        nn_numpy.export_weights(str(self.candidate_path), str(self.weights_path(self.candidate_path)))
+
+        self.metrics['train'].add(time.perf_counter() - start, samples=samples)
+        logger.info(self.metrics['train'])
+
+    def _gate(self, pool):
+        """Plays the candidate against the best network and promotes it when gate_sprt finds it stronger"""
+        best = str(self.weights_path(self.best_path))
+        candidate = str(self.weights_path(self.candidate_path))
+        arena = Arena(self.workers, seed=random.getrandbits(32))
+        result = arena.match(NNAgent(candidate, self.gate_iters, batch_size=self.batch_size, name='candidate'),
+                             NNAgent(best, self.gate_iters, batch_size=self.batch_size, name='best'),
+                             self.gate_games, sprt=self.gate_sprt, pool=pool)
+        self.metrics['gate'].add(result.seconds, games=result.games, evaluations=result.evaluations)
+        logger.info(self.metrics['gate'])
+
+        decision = result.decision
+        if decision == 'H1' or (decision is None and result.interval()[0] > 0.5):
+            os.replace(candidate, best)
+            os.replace(self.candidate_path, self.best_path)
+            logger.info(f'Promoted candidate with score {result.score:.3f} over {result.games} games')
+        else:
+            logger.info(f'Kept best network, candidate scored {result.score:.3f} over {result.games} games')
+
+    def report(self):
+        for m in self.metrics.values():
+            logger.info(m)
@@ -0,0 +1,225 @@
+"""
+Fixed-width binary records of MCTS training samples.
+
+A record file is a 16 byte header followed by packed RECORD_DTYPE records, so it can be
+appended to with plain writes and read back as a memory-mapped NumPy structured array.
+Visits and wins are indexed by square. Wins are float32 since searches back up fractional
+results (cached rollout means, network values).
+"""
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src.ai.state_save import StateSave
+from src.core.logger import logger
+from src.othello.game_logic import Move
+
+MAGIC = b'OREC'
+VERSION = 1
+
+RECORD_DTYPE = np.dtype([
+    ('black', '<u8'),
+    ('white', '<u8'),
+    ('side', 'i1'),
+    ('visits', '<u4', (64,)),
+    ('wins', '<f4', (64,)),
+])
+
+# Magic, version, record size, reserved
+HEADER_DTYPE = np.dtype([('magic', 'S4'), ('version', '<u4'), ('itemsize', '<u4'), ('reserved', '<u4')])
+HEADER_SIZE = HEADER_DTYPE.itemsize
+
+
+def empty(n=0) -> np.ndarray:
+    return np.zeros(n, dtype=RECORD_DTYPE)
+
+
+def from_state(state: StateSave | dict | str) -> np.ndarray:
+    """
+    Converts a StateSave, or its to_dict / to_json output, to a single record.
+    :return: Array of shape (1,)
+    """
+    if isinstance(state, StateSave):
+        state = state.to_dict()
+    elif isinstance(state, str):
+        state = json.loads(state)
+
+    record = empty(1)
+    record['black'] = int(state['bits_black'])
+    record['white'] = int(state['bits_white'])
+    record['side'] = int(state['current_player'])
+    for r in state['results']:
+        square, values = next(iter(r.items()))
+        record['visits'][0, int(square)] = values['visits']
+        record['wins'][0, int(square)] = values['wins']
+    return record
+
+
+def from_states(states: list[StateSave | dict | str]) -> np.ndarray:
+    """
+    Batch version of from_state. Results of all states are gathered in one pass and scattered into
+    the visits and wins columns at once.
+    """
+    states = [s.to_dict() if isinstance(s, StateSave) else json.loads(s) if isinstance(s, str) else s
+              for s in states]
+    recs = empty(len(states))
+    recs['black'] = [int(s['bits_black']) for s in states]
+    recs['white'] = [int(s['bits_white']) for s in states]
+    recs['side'] = [int(s['current_player']) for s in states]
+
+    rows, squares, visits, wins = [], [], [], []
+    for i, s in enumerate(states):
+        for r in s['results']:
+            square, values = next(iter(r.items()))
+            rows.append(i)
+            squares.append(int(square))
+            visits.append(values['visits'])
+            wins.append(values['wins'])
+
+    recs['visits'][rows, squares] = visits
+    recs['wins'][rows, squares] = wins
+    return recs
+
+
+def to_state_dict(record: np.void) -> dict:
+    """Converts a record back to the dict layout of StateSave.to_dict, most visited move first"""
+    side = int(record['side'])
+    visits = record['visits']
+    squares = sorted(np.nonzero(visits)[0], key=lambda s: visits[s], reverse=True)
+    return {
+        'bits_black': str(int(record['black'])),
+        'bits_white': str(int(record['white'])),
+        'current_player': side,
+        'results': [
+            {
+                int(s):
+                    {
+                        'move_str': Move(side, int(s)).pos_to_str(),
+                        'wins': float(record['wins'][s]),
+                        'visits': int(visits[s]),
+                        'ratio': float(record['wins'][s]) / int(visits[s])
+                    }
+            } for s in squares]
+    }
+
+
+def _header() -> bytes:
+    return np.array((MAGIC, VERSION, RECORD_DTYPE.itemsize, 0), dtype=HEADER_DTYPE).tobytes()
+
+
+def _create(path: Path):
+    """Creates an empty record file. The header is written to a temporary file first, so a crash never
+    leaves a file with a partial header behind."""
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(_header())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _check_header(path: Path):
+    with open(path, 'rb') as f:
+        raw = f.read(HEADER_SIZE)
+
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f'{path} is too short to be a record file')
+
+    header = np.frombuffer(raw, dtype=HEADER_DTYPE)[0]
+    if header['magic'] != MAGIC:
+        raise ValueError(f'{path} is not a record file')
+    if header['version'] != VERSION or header['itemsize'] != RECORD_DTYPE.itemsize:
+        raise ValueError(f'{path} has record format {header["version"]} with {header["itemsize"]} byte records. '
+                         f'Expected format {VERSION} with {RECORD_DTYPE.itemsize} byte records')
+
+
+def count(path) -> int:
+    """
+    Number of complete records in the file. A partially written last record is not counted, and a file
+    shorter than the header (e.g. created right before a crash) counts as empty.
+    """
+    return max(os.path.getsize(path) - HEADER_SIZE, 0) // RECORD_DTYPE.itemsize
+
+
+def append(path, records: np.ndarray, fsync=False) -> int:
+    """
+    Appends records to a file, creating it (with its header) when missing or shorter than the header.
+    A partially written last record, e.g. from a crash, is cut off first.
+    :param records: Array of RECORD_DTYPE
+    :param fsync: Flush the file to disk before returning
+    :return: Number of records in the file
+    """
+    path = Path(path)
+    records = np.asarray(records, dtype=RECORD_DTYPE)
+
+    if not path.exists() or os.path.getsize(path) < HEADER_SIZE:
+        _create(path)
+    else:
+        _check_header(path)
+
+    with open(path, 'r+b') as f:
+        f.truncate(HEADER_SIZE + count(path) * RECORD_DTYPE.itemsize)
+        f.seek(0, os.SEEK_END)
+        f.write(records.tobytes())
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+    return count(path)
+
+
+def write(path, records: np.ndarray):
+    """Writes records to a new file, replacing any existing one"""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(_header())
+        f.write(np.asarray(records, dtype=RECORD_DTYPE).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def load(path, mmap=True) -> np.ndarray:
+    """
+    Reads a record file. A file shorter than the header holds no records.
+    :param mmap: Memory-map the records read-only instead of reading them into memory
+    :return: Structured array of RECORD_DTYPE
+    """
+    path = Path(path)
+    if os.path.getsize(path) < HEADER_SIZE:
+        return empty()
+    _check_header(path)
+    n = count(path)
+
+    if n == 0:
+        return empty()
+    if mmap:
+        return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(n,))
+
+    with open(path, 'rb') as f:
+        f.seek(HEADER_SIZE)
+        return np.frombuffer(f.read(n * RECORD_DTYPE.itemsize), dtype=RECORD_DTYPE).copy()
+
+
+def convert_json(json_path='positions.jsonl', out_path='data.rec') -> int:
+    """
+    Converts saved states to a record file. Reads both the JSON-lines files of PositionStore and the
+    legacy data.json (a JSON list of JSON strings).
+    :return: Number of records written
+    """
+    with open(json_path, 'r') as f:
+        text = f.read()
+
+    if text.lstrip().startswith('['):
+        states = json.loads(text)
+    else:
+        states = [line for line in text.splitlines() if line.strip()]
+
+    records = from_states(states)
+    write(out_path, records)
+    logger.info(f'Converted {len(records)} states from {json_path} to {out_path} '
+                f'({os.path.getsize(json_path)} -> {os.path.getsize(out_path)} bytes)')
+    return len(records)
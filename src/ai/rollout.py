@@ -0,0 +1,121 @@
+import numpy as np
+
+from src.othello import batch, bitops, scoring
+from src.othello.position import Position
+
+_rng = np.random.default_rng()
+
+
+def seed(s: int):
+    """Reseeds the module level generator, e.g. in a freshly forked worker process"""
+    global _rng
+    _rng = np.random.default_rng(s)
+
+
+def random_rollout(position: Position, color: int) -> int:
+    """
+    Plays one uniformly random game to completion on plain ints.
+    :param position: Position to start from
+    :param color: Color the result is scored for
+    :return: 1 if color finishes with more discs, 0 otherwise (a draw is 0 for both colors)
+    """
+    diff = random_rollout_diff(position)
+    return int((diff if color == position.current_player else -diff) > 0)
+
+
+def random_rollout_diff(position: Position) -> int:
+    """
+    Plays one uniformly random game to completion on plain ints.
+    :return: Final disc differential from the perspective of the color to move in position
+    """
+    p = position.player_bits
+    o = position.opp_bits
+    c = position.current_player
+    while True:
+        moves = bitops.move_mask(p, o)
+        if moves == 0:
+            if bitops.move_mask(o, p) == 0:
+                break
+            # Pass
+            p, o, c = o, p, -c
+            continue
+
+        square = bitops.random_square(moves)
+        flips = bitops.flip_mask(p, o, square)
+        p, o, c = o & ~flips, p | flips | (1 << square), -c
+
+    if c != position.current_player:
+        p, o = o, p
+
+    return scoring.disc_diff(p, o)
+
+
+def random_squares(masks: np.ndarray, rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Picks one set bit uniformly at random from every mask.
+    :param masks: uint64 array of shape (N,). Every mask must have at least one bit set
+    :param rng: Random generator, defaults to a module level generator
+    :return: int64 array of shape (N,) holding the chosen squares
+    """
+    if rng is None:
+        rng = _rng
+
+    bits = batch.unpack(masks)
+    counts = bits.sum(axis=1)
+    picks = (rng.random(len(counts)) * counts).astype(np.int64)
+    return np.argmax(np.cumsum(bits, axis=1) > picks[:, None], axis=1)
+
+
+def random_rollouts(p: np.ndarray, o: np.ndarray, rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Plays K uniformly random games to completion in lockstep, one per lane. Each lane passes when
+    it has no legal move and finishes when neither side can move.
+    :param p: uint64 array of shape (K,) holding the bits of the side to move in each lane
+    :param o: uint64 array of shape (K,) holding the bits of the opponent in each lane
+    :param rng: Random generator, defaults to a module level generator
+    :return: int64 array of shape (K,) with the final disc differential of each lane,
+    from the perspective of the side that was to move at the start
+    """
+    p = np.array(p, dtype=np.uint64, ndmin=1)
+    o = np.array(o, dtype=np.uint64, ndmin=1)
+    n = len(p)
+
+    final_p = np.zeros(n, dtype=np.uint64)
+    final_o = np.zeros(n, dtype=np.uint64)
+
+    lanes = np.arange(n)
+    swapped = np.zeros(n, dtype=bool)  # True when p holds the starting side's opponent
+    passes = np.zeros(n, dtype=np.int8)
+
+    while len(lanes) > 0:
+        moves = batch.move_masks(p, o)
+        can_move = moves != 0
+
+        passes = np.where(can_move, 0, passes + 1)
+        done = passes >= 2
+        if done.any():
+            final_p[lanes[done]] = np.where(swapped[done], o[done], p[done])
+            final_o[lanes[done]] = np.where(swapped[done], p[done], o[done])
+            keep = ~done
+            lanes, p, o, moves, can_move, swapped, passes = \
+                lanes[keep], p[keep], o[keep], moves[keep], can_move[keep], swapped[keep], passes[keep]
+
+        if can_move.any():
+            squares = random_squares(moves[can_move], rng)
+            p_next, o_next = batch.play(p[can_move], o[can_move], batch.SQUARE_BITS[squares])
+            p[can_move] = p_next
+            o[can_move] = o_next
+
+        # Every remaining lane hands the turn over, whether it moved or passed
+        p, o = o, p
+        swapped = ~swapped
+
+    return scoring.disc_diffs(final_p, final_o)
+
+
+def rollout_scores(p: np.ndarray, o: np.ndarray, rng: np.random.Generator = None) -> np.ndarray:
+    """
+    Runs random_rollouts and converts each lane into a win score for the side to move at the start.
+    :return: int64 array of shape (K,), 1 for a win and 0 otherwise
+    """
+    return (random_rollouts(p, o, rng) > 0).astype(np.int64)
@@ -0,0 +1,90 @@
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class SelectionPolicy(ABC):
+    """
+    Picks the child to descend into during MCTS selection. select works on MCTSNode children,
+    scores on arrays of child statistics (e.g. a slice of an ArrayTree).
+    """
+
+    @abstractmethod
+    def select(self, node):
+        pass
+
+    @abstractmethod
+    def scores(self, wins: np.ndarray, visits: np.ndarray, parent_visits: int, priors: np.ndarray = None) -> np.ndarray:
+        pass
+
+
+class UCT(SelectionPolicy):
+    def __init__(self, exploration=math.sqrt(2)):
+        """
+        UCB1 applied to trees: wins / visits + exploration * sqrt(ln(parent visits) / visits).
+        The default exploration constant matches the original sqrt(2 * ln(N) / n) term.
+        Unvisited children are picked first.
+        """
+        self.exploration = exploration
+
+    def __repr__(self):
+        return f'UCT(exploration={self.exploration})'
+
+    def select(self, node):
+        c = self.exploration
+        log_n = node.log_visits()
+        best = None
+        best_score = -math.inf
+
+        for child in node.children:
+            visits = child.visits
+            if visits <= 0:
+                return child
+            score = child.wins / visits + c * math.sqrt(log_n / visits)
+            if score > best_score:
+                best = child
+                best_score = score
+
+        return best
+
+    def scores(self, wins, visits, parent_visits, priors=None):
+        visits = visits.astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = wins / visits + self.exploration * np.sqrt(math.log(max(parent_visits, 1)) / visits)
+        return np.where(visits > 0, s, np.inf)
+
+
+class PUCT(SelectionPolicy):
+    def __init__(self, exploration=1.5):
+        """
+        Prior-weighted selection as used by AlphaZero:
+        Q + exploration * prior * sqrt(parent visits) / (1 + visits), with Q = 0 for unvisited children.
+        Children take their prior from MCTSNode.prior.
+        """
+        self.exploration = exploration
+
+    def __repr__(self):
+        return f'PUCT(exploration={self.exploration})'
+
+    def select(self, node):
+        c = self.exploration * math.sqrt(node.visits)
+        best = None
+        best_score = -math.inf
+
+        for child in node.children:
+            visits = child.visits
+            q = child.wins / visits if visits > 0 else 0.0
+            score = q + c * child.prior / (1 + visits)
+            if score > best_score:
+                best = child
+                best_score = score
+
+        return best
+
+    def scores(self, wins, visits, parent_visits, priors=None):
+        if priors is None:
+            priors = np.full(len(visits), 1.0 / max(len(visits), 1))
+        visits = visits.astype(np.float64)
+        q = np.divide(wins, visits, out=np.zeros(len(visits)), where=visits > 0)
+        return q + self.exploration * priors * math.sqrt(parent_visits) / (1 + visits)
@@ -0,0 +1,175 @@
+"""
+Append-only storage of self-play data.
+
+Every worker streams its records into its own shard file (see ShardWriter), so nothing is
+held in memory and a crash loses at most the records not flushed yet. compact merges the
+shards into the main record file, newer searches of a position replacing older ones, and can
+be rerun safely after an interruption at any point.
+"""
+from pathlib import Path
+
+import numpy as np
+
+from src.ai import records
+from src.ai.state_save import PositionStore, SavedMoveData, StateSave
+from src.core.logger import logger
+from src.othello import symmetry
+from src.othello.game_logic import Move
+
+DATA_PATH = 'data.rec'
+SHARD_DIR = 'shards'
+
+
+def shard_paths(directory=SHARD_DIR) -> list[Path]:
+    directory = Path(directory)
+    if not directory.exists():
+        return []
+    return sorted(directory.glob('shard-*.rec'))
+
+
+class ShardWriter:
+    def __init__(self, directory=SHARD_DIR, worker_id=0, fsync_every=32):
+        """
+        Appends records to shards/shard-<worker_id>.rec. An existing shard is resumed: writing continues
+        after its last complete record.
+        :param worker_id: Writers must use distinct ids. Reusing the id of a crashed worker resumes its shard
+        :param fsync_every: Records buffered before they are appended and flushed to disk
+        """
+        if fsync_every < 1:
+            raise ValueError(f'Expected fsync_every of at least 1. Received {fsync_every}')
+
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.path = Path(directory) / f'shard-{worker_id}.rec'
+        self.fsync_every = fsync_every
+        self.written = records.count(self.path) if self.path.exists() else 0
+        self._buffer = []
+
+    def __repr__(self):
+        return f'ShardWriter({self.path}, written={self.written}, buffered={len(self._buffer)})'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, state: StateSave | dict | np.ndarray):
+        """Buffers a record, given as a StateSave, its to_dict output or a record array"""
+        if not isinstance(state, np.ndarray):
+            state = records.from_state(state)
+        self._buffer.append(state)
+
+        if len(self._buffer) >= self.fsync_every:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        self.written = records.append(self.path, np.concatenate(self._buffer), fsync=True)
+        self._buffer.clear()
+
+    def close(self):
+        self.flush()
+
+
+def canonical_keys(recs: np.ndarray) -> np.ndarray:
+    """(N, 3) uint64 array of the canonical (black, white, side) key of every record"""
+    black, white, _ = symmetry.canonical_arrays(recs['black'], recs['white'])
+    return np.column_stack((black, white, recs['side'].astype(np.int64).astype(np.uint64)))
+
+
+def dedupe(recs: np.ndarray) -> np.ndarray:
+    """
+    Keeps the last, i.e. newest, record of every position, counting symmetric variants as the same
+    position. Records are replaced rather than merged, so compacting again never counts a search twice.
+    """
+    if len(recs) == 0:
+        return recs
+    _, last = np.unique(canonical_keys(recs)[::-1], axis=0, return_index=True)
+    return recs[np.sort(len(recs) - 1 - last)]
+
+
+def load_all(directory=SHARD_DIR, data_path=DATA_PATH) -> np.ndarray:
+    """Records of the main file followed by those of every shard, oldest first, not deduplicated"""
+    parts = [records.load(p, mmap=False) for p in [Path(data_path)] + shard_paths(directory) if p.exists()]
+    return np.concatenate(parts) if parts else records.empty()
+
+
+def compact(directory=SHARD_DIR, data_path=DATA_PATH) -> int:
+    """
+    Merges the shards into the main record file, keeping one record per position, then removes the shards.
+    The main file is replaced atomically, so an interrupted compaction leaves either the old file
+    and all shards or the new file, possibly next to shards whose records it already holds.
+    :return: Number of records in the main file
+    """
+    shards = shard_paths(directory)
+    merged = dedupe(load_all(directory, data_path))
+    records.write(data_path, merged)
+
+    for p in shards:
+        p.unlink()
+
+    logger.info(f'Compacted {len(shards)} shards into {data_path}: {len(merged)} records')
+    return len(merged)
+
+
+def migrate_json(data_path=DATA_PATH) -> int:
+    """
+    Creates the main record file from the JSON position store (and through it the legacy data.json)
+    when it does not exist yet.
+    :return: Number of records migrated
+    """
+    if Path(data_path).exists():
+        return 0
+
+    store = PositionStore()
+    if len(store) == 0:
+        return 0
+
+    records.write(data_path, records.from_states(store.data))
+    logger.info(f'Migrated {len(store)} states from {store.path} to {data_path}')
+    return len(store)
+
+
+class RecordIndex:
+    def __init__(self, recs: np.ndarray = None):
+        """
+        Hash index over records by canonical position, answering find_best_move in O(1)
+        like StateSaveDecoder. Only the most visited move of each position is kept, taken from its
+        last record as in dedupe.
+        """
+        self.index = {}
+        if recs is not None and len(recs):
+            self.add(recs)
+
+    def __len__(self):
+        return len(self.index)
+
+    @classmethod
+    def load(cls, directory=SHARD_DIR, data_path=DATA_PATH):
+        """Indexes the main record file and every shard"""
+        return cls(load_all(directory, data_path))
+
+    def add(self, recs: np.ndarray):
+        recs = np.atleast_1d(np.asarray(recs, dtype=records.RECORD_DTYPE))
+        recs = recs[recs['visits'].any(axis=1)]
+        black, white, transforms = symmetry.canonical_arrays(recs['black'], recs['white'])
+        best = recs['visits'].argmax(axis=1)
+        rows = np.arange(len(recs))
+
+        for key, value in zip(zip(black.tolist(), white.tolist(), recs['side'].tolist()),
+                              zip(best.tolist(), recs['wins'][rows, best].tolist(),
+                                  recs['visits'][rows, best].tolist(), transforms.tolist())):
+            self.index[key] = value
+
+    def find_best_move(self, bits_black, bits_white, current_player: int) -> None | SavedMoveData:
+        """Same as StateSaveDecoder.find_best_move"""
+        key, t = symmetry.canonical(int(bits_black), int(bits_white), int(current_player))
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+
+        square, wins, visits, r_t = entry
+        pos = symmetry.transform_square(symmetry.transform_square(square, r_t), symmetry.INVERSE[t])
+        return SavedMoveData(pos, Move(current_player, pos).pos_to_str(), wins, visits, wins / visits)
+
@@ -5,6 +5,10 @@ import numpy as np
 
 from dataclasses import dataclass
 
+from src.core.logger import logger
+from src.othello import symmetry
+from src.othello.game_logic import Move
+
 
 @dataclass()
 class SavedMoveData:
@@ -21,8 +25,8 @@ class StateSave:
         self.current_player = current_player
         self.results = results
 
-    def to_json(self):
-        data = {
+    def to_dict(self) -> dict:
+        return {
             'bits_black': str(self.bits_black),
             'bits_white': str(self.bits_white),
             'current_player': self.current_player,
@@ -38,41 +42,119 @@ class StateSave:
                 } for r in self.results]
         }
 
-        return json.dumps(data, indent=4)
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=4)
 
     def find_best_move(self):
         return self.results[0]
 
 
-class StateSaveDecoder(json.JSONDecoder):
-    def __init__(self):
-        super().__init__()
-
-        if Path('data.json').exists():
-            with open('data.json', 'r') as f:
-                self.data = json.load(f)
-
-                # convert str to dict
-                self.data = [self._as_dict(d) for d in self.data]
+class PositionStore:
+    def __init__(self, path='positions.jsonl', legacy_path='data.json'):
+        """
+        Saved positions with a hash index, so lookups take O(1) instead of a scan over every record.
+        Records are the dicts of StateSave.to_dict, stored one per line, and added by appending a line.
+        The index is keyed by symmetry.canonical, so symmetric variants of a saved position are found too.
+        :param path: JSON-lines file holding the records
+        :param legacy_path: data.json written by earlier versions (a JSON list of JSON strings). When path
+        does not exist yet, its records are migrated into path once. The legacy file is left untouched.
+        """
+        self.path = Path(path)
+        self.data = []
+        self.index = {}
+
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        self._insert(json.loads(line))
+        elif legacy_path is not None and Path(legacy_path).exists():
+            self._migrate(Path(legacy_path))
+
+    def __len__(self):
+        return len(self.data)
+
+    def __contains__(self, key: tuple[int, int, int]):
+        return self.get(*key) is not None
+
+    def _migrate(self, legacy_path: Path):
+        with open(legacy_path, 'r') as f:
+            records = [json.loads(d) if isinstance(d, str) else d for d in json.load(f)]
+
+        added = [d for d in records if self._insert(d)]
+        with open(self.path, 'w') as f:
+            for d in added:
+                f.write(json.dumps(d) + '\n')
+
+        logger.info(f'Migrated {len(added)} of {len(records)} states from {legacy_path} to {self.path}')
+
+    @staticmethod
+    def _key(d: dict) -> tuple[tuple[int, int, int], int]:
+        return symmetry.canonical(int(d['bits_black']), int(d['bits_white']), int(d['current_player']))
+
+    def _insert(self, d: dict) -> bool:
+        key, t = self._key(d)
+        if key in self.index:
+            return False
+
+        self.index[key] = (len(self.data), t)
+        self.data.append(d)
+        return True
+
+    def add(self, state: StateSave | dict | str) -> bool:
+        """
+        Appends a record unless the position (or a symmetric variant) is already saved.
+        :param state: StateSave, or its to_dict / to_json output
+        :return: Whether the record was added
+        """
+        if isinstance(state, StateSave):
+            state = state.to_dict()
+        elif isinstance(state, str):
+            state = json.loads(state)
+
+        if not self._insert(state):
+            return False
+
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(state) + '\n')
+        return True
+
+    def get(self, bits_black, bits_white, current_player: int) -> tuple[dict, int, int] | None:
+        """
+        :return: (record, transform of the record, transform of the query) or None. A square s of the
+        record is square transform_square(transform_square(s, record t), INVERSE[query t]) of the query.
+        """
+        key, t = symmetry.canonical(int(bits_black), int(bits_white), int(current_player))
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        return self.data[entry[0]], entry[1], t
+
+    def find_best_move(self, bits_black, bits_white, current_player: int) -> None | SavedMoveData:
+        """
+        Finds the best saved move of the position or of any of its symmetric variants.
+        The move is mapped back onto the given position.
+        """
+        found = self.get(bits_black, bits_white, current_player)
+        if found is None:
+            return None
 
-        else:
-            self.data = None
+        d, d_t, t = found
+        # Data is stored sorted by best ratio first
+        best_key = next(iter(d['results'][0]))  # Move pos as str
+        best_val = d['results'][0][best_key]  # All other properties
 
-    def find_best_move(self, bits_black: np.uint64, bits_white: np.uint64, current_player: int) -> None | SavedMoveData:
-        if self.data is None:
-            return None
+        pos = symmetry.transform_square(symmetry.transform_square(int(best_key), d_t), symmetry.INVERSE[t])
+        return SavedMoveData(pos, Move(current_player, pos).pos_to_str(), best_val['wins'],
+                             best_val['visits'], best_val['ratio'])
 
-        for d in self.data:
-            d = self._as_dict(d)
-            if np.uint64(d['bits_black']) == bits_black and np.uint64(d['bits_white']) == bits_white \
-                    and int(d['current_player']) == current_player:
-                # Data is stored sorted by best ratio first
-                best_key = next(iter(d['results'][0]))  # Move pos as str
-                best_val = d['results'][0][best_key]  # All other properties
 
-                return SavedMoveData(int(best_key), best_val['move_str'], best_val['wins'], best_val['visits'], best_val['ratio'])
+class StateSaveDecoder(json.JSONDecoder):
+    def __init__(self, store: PositionStore = None):
+        """Read access to the saved positions of a PositionStore, data.json being migrated on first use"""
+        super().__init__()
+        self.store = store if store is not None else PositionStore()
+        self.data = self.store.data if len(self.store) else None
 
-        return None
-    def _as_dict(self, d: str):
-        """Loads a formatted JSON string into a dictionary"""
-        return json.loads(d)
+    def find_best_move(self, bits_black: np.uint64, bits_white: np.uint64, current_player: int) -> None | SavedMoveData:
+        return self.store.find_best_move(bits_black, bits_white, current_player)
@@ -0,0 +1,55 @@
+import time
+
+from src.othello.position import Position
+from src.othello import scoring
+
+
+class TimeManager:
+    def __init__(self, game_time: float, safety_margin: float = 0.5, min_move_time: float = 0.05,
+                 midgame_factor: float = 1.5):
+        """
+        Splits a game clock into per-move search budgets.
+        :param game_time: Total time in seconds for all of our moves in the game
+        :param safety_margin: Seconds never handed out, to absorb overhead outside the search
+        :param min_move_time: Smallest budget handed out for a move
+        :param midgame_factor: Multiplier on the budget while the board is between one and three quarters full
+        """
+        self.game_time = game_time
+        self.remaining = float(game_time)
+        self.safety_margin = safety_margin
+        self.min_move_time = min_move_time
+        self.midgame_factor = midgame_factor
+
+    def __repr__(self):
+        return f'TimeManager(game_time={self.game_time}, remaining={self.remaining:.2f})'
+
+    def budget(self, position: Position) -> float:
+        """
+        Returns the time in seconds to spend searching the given position. The remaining clock is
+        shared evenly over our remaining moves, estimated as half the empty squares.
+        """
+        empties = 64 - scoring.popcount(position.black | position.white)
+        moves_left = max((empties + 1) // 2, 1)
+        usable = max(self.remaining - self.safety_margin, 0.0)
+
+        budget = usable / moves_left
+        if 16 <= empties <= 48:
+            budget *= self.midgame_factor
+
+        return max(min(budget, usable), min(self.min_move_time, usable))
+
+    def charge(self, elapsed: float):
+        """Deducts the time a move actually took from the clock"""
+        self.remaining -= elapsed
+
+    def search(self, mcts, position: Position, **kwargs):
+        """
+        Runs mcts.search with this move's budget and charges the time it took.
+        :param mcts: MCTS rooted at position
+        :param position: Position being searched
+        :param kwargs: Passed on to MCTS.search
+        """
+        start = time.perf_counter()
+        result = mcts.search(time_limit=self.budget(position), **kwargs)
+        self.charge(time.perf_counter() - start)
+        return result
@@ -0,0 +1,117 @@
+import random
+from collections import OrderedDict
+
+from src.othello.position import Position
+from src.othello.color import BLACK
+
+_zobrist_rng = random.Random(0x0DEE907E110)
+
+# One table per color and byte of the board, so a hash is 16 lookups instead of one per disc
+ZOBRIST_BLACK = [[_zobrist_rng.getrandbits(64) for _ in range(256)] for _ in range(8)]
+ZOBRIST_WHITE = [[_zobrist_rng.getrandbits(64) for _ in range(256)] for _ in range(8)]
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
+
+
+def zobrist_hash(black: int, white: int, current_player: int) -> int:
+    """
+    Computes the 64-bit Zobrist hash of a position.
+    :param black: Bits of black
+    :param white: Bits of white
+    :param current_player: Color to move
+    """
+    h = ZOBRIST_SIDE if current_player == BLACK else 0
+    for i in range(8):
+        h ^= ZOBRIST_BLACK[i][black & 0xFF] ^ ZOBRIST_WHITE[i][white & 0xFF]
+        black >>= 8
+        white >>= 8
+    return h
+
+
+class NodeStats:
+    """Visit and win counts of a search node. Transposed nodes share one instance."""
+    __slots__ = ('visits', 'wins')
+
+    def __init__(self, visits=0, wins=0):
+        self.visits = visits
+        self.wins = wins
+
+    def __repr__(self):
+        return f'NodeStats(visits={self.visits}, wins={self.wins})'
+
+
+class TTEntry(NodeStats):
+    __slots__ = ('key',)
+
+    def __init__(self, key: tuple[int, int, int]):
+        super().__init__()
+        self.key = key
+
+
+class TranspositionTable:
+    def __init__(self, capacity=200_000):
+        """
+        Zobrist-hashed table of NodeStats shared by all nodes holding the same position.
+        Wins are stored from the perspective of the searching color, so a table should only
+        be reused by searches for one color.
+        :param capacity: Maximum number of entries. The least recently used entry is evicted
+        when full; nodes already holding an evicted entry keep using it.
+        """
+        if capacity < 1:
+            raise ValueError(f'Expected a capacity of at least 1. Received {capacity}')
+
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return f'TranspositionTable(size={len(self)}/{self.capacity}, hits={self.hits}, ' \
+               f'misses={self.misses}, evictions={self.evictions}, hit_rate={self.hit_rate():.2%})'
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def _find(self, h: int, key: tuple[int, int, int]) -> TTEntry | None:
+        entry = self.entries.get(h)
+
+        if entry is None or entry.key != key:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(h)
+        return entry
+
+    def lookup(self, position: Position) -> TTEntry | None:
+        """Returns the entry for the position, or None. Counts a hit or a miss."""
+        return self._find(zobrist_hash(*position.key()), position.key())
+
+    def get_or_create(self, position: Position) -> TTEntry:
+        """Returns the shared entry for the position, creating (and possibly evicting) on a miss"""
+        key = position.key()
+        h = zobrist_hash(*key)
+        entry = self._find(h, key)
+        if entry is not None:
+            return entry
+
+        # A colliding hash simply replaces the older entry
+        entry = TTEntry(key)
+        self.entries[h] = entry
+        self.entries.move_to_end(h)
+
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
@@ -0,0 +1,97 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from src.ai import rollout
+from src.ai.mcts import MCTS, MCTSNode
+from src.ai.selection import SelectionPolicy
+from src.othello.game_logic import GameBoard, Move
+from src.othello.position import Position
+
+
+def _seed_worker():
+    seed = os.getpid() ^ time.time_ns()
+    random.seed(seed)
+    rollout.seed(seed & 0xFFFFFFFF)
+
+
+def _rollout_wins(position: Position, color: int, k: int) -> int:
+    """Runs k pure-int rollouts of the position in a worker process"""
+    node = MCTSNode(position)
+    return sum(node.rollout(color) for _ in range(k))
+
+
+class TreeParallelMCTS(MCTS):
+    def __init__(self, position: Position | GameBoard, iter_max=100, verbose=False, rollout_batch=1,
+                 threads=4, virtual_loss=1, processes=0, selection: SelectionPolicy = None):
+        """
+        MCTS where several threads descend one shared tree (tree parallelism).
+        Selection, expansion and backup happen under a lock. Rollouts run outside it, either on the
+        NumPy lockstep rollout engine, whose array kernels release the GIL while they run, or in a
+        pool of worker processes.
+        A descending thread adds virtual loss to every node on its path, which uct_select_child
+        sees as extra lost visits, so other threads spread over different leaves.
+        :param rollout_batch: Rollouts per leaf. Batches above 1 run on the NumPy engine and spend more
+        time outside the GIL, but a single pure-int rollout is about 3x faster per rollout, so batches
+        only pay off with several CPUs
+        :param threads: Number of threads searching the tree
+        :param virtual_loss: Visits counted as losses per pending descent. Must be at least 1
+        :param processes: When above 0, rollouts run in this many worker processes instead of
+        on the calling threads. Keep threads at least as high. Call close() when done.
+        """
+        if virtual_loss < 1:
+            raise ValueError(f'Expected a virtual loss of at least 1. Received {virtual_loss}')
+
+        super().__init__(position, iter_max=iter_max, verbose=verbose, rollout_batch=rollout_batch,
+                         selection=selection)
+        self.threads = threads
+        self.virtual_loss = virtual_loss
+        self.lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(processes, initializer=_seed_worker) if processes > 0 else None
+
+    def search(self, return_nodes=False, time_limit: float = None) -> Move | list[MCTSNode]:
+        if self.iter_max is None and time_limit is None:
+            raise ValueError('Either iter_max or time_limit must be set')
+
+        iter_max = self.iter_max if self.iter_max is not None else float('inf')
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        claimed = [0]
+
+        def worker():
+            color = self.root.position.current_player
+            while True:
+                with self.lock:
+                    if claimed[0] >= iter_max or (deadline is not None and time.perf_counter() >= deadline):
+                        return
+                    claimed[0] += 1
+                    node = self.tree_policy(self.root)
+                    node.apply_virtual_loss(self.virtual_loss)
+
+                result, visits = self.evaluate(node, color)
+
+                with self.lock:
+                    node.apply_virtual_loss(-self.virtual_loss)
+                    self.backup(node, result, visits)
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+
+        return self._result(return_nodes)
+
+    def evaluate(self, node: MCTSNode, initiation_color: int):
+        if self._executor is None:
+            return super().evaluate(node, initiation_color)
+
+        wins = self._executor.submit(_rollout_wins, node.position, initiation_color, self.rollout_batch).result()
+        return wins, self.rollout_batch
+
+    def close(self):
+        super().close()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -1,17 +1,28 @@
-import json
 import multiprocessing
 
 import pyfiglet
 import random
-import numpy as np
+import time
 
 from multiprocessing import Pool
 
 from src.ai import nn as nn
-from src.othello.game_logic import GameBoard, BitBoard, Move
+from src.othello.game_logic import Move
+from src.othello.position import Position
+from src.core import cfg
 from src.core.logger import logger
 from src.ai.mcts import MCTS
-from src.ai.state_save import StateSave, StateSaveDecoder, SavedMoveData
+from src.ai.tree_parallel import TreeParallelMCTS
+from src.ai.nn_mcts import NNMCTS
+from src.ai.evaluator import load_evaluator
+from src.ai import eval_cache as ec
+from src.ai.time_manager import TimeManager
+from src.ai.state_save import StateSave, SavedMoveData
+from src.ai import records, shards
+from src.ai.shards import ShardWriter, RecordIndex
+from src.ai.pipeline import Pipeline
+from src.ai.inference_server import InferenceServer
+from src.ai.arena import Arena, MCTSAgent, NNAgent, RandomAgent, SPRT
 
 
 def greeting():
@@ -30,158 +41,189 @@ greet()
 
 
 def play_once():
-    board = GameBoard(BitBoard(1), BitBoard(-1))
-    legal = board.legal_moves(-board.current_player)
+    position = Position()
+    legal = position.legal_moves(-position.current_player)
     for l in legal:
-        board.apply_move(l)
-        board.print()
-        board = GameBoard(BitBoard(1), BitBoard(-1))
+        position.pass_move().play(l).print()
 
 
 def play_mcts_single(iterations=350):
-    board = GameBoard(BitBoard(1), BitBoard(-1))
-    mcts = MCTS(board, iter_max=iterations, verbose=True)
+    position = Position()
+    mcts = MCTS(position, iter_max=iterations, verbose=True)
     search = mcts.search()
     print(search)
 
 
 def test_moves():
-    bb1 = BitBoard(-1, np.uint64(1177713353440496642))
-    bb2 = BitBoard(1, np.uint64(4611686018427387904))
-    board = GameBoard(bb1, bb2)
-    legal = board.legal_moves(board.current_player)
+    position = Position(black=1177713353440496642, white=4611686018427387904)
+    legal = position.legal_moves()
     print(legal)
 
 
-def play_mcts_full(iters=1500):
-    board = GameBoard(BitBoard(-1), BitBoard(1))
-    while not board.is_game_complete():
-        legal = board.legal_moves(board.current_player)
+def _advance_trees(trees, move=None):
+    """Advances every search tree past the move just played (None for a pass), keeping the searched subtree."""
+    for mcts in trees:
+        mcts.advance(move)
+
+
+def play_mcts_full(iters=1500, game_time=None):
+    """
+    :param iters: Iterations per move, or the cap on iterations when playing on a clock
+    :param game_time: Seconds on each color's clock. None searches a fixed number of iterations
+    """
+    position = Position()
+    # One tree per color so each keeps its subtree between its own moves
+    trees = {-1: MCTS(position, iter_max=iters, verbose=True), 1: MCTS(position, iter_max=iters, verbose=True)}
+    clocks = {-1: TimeManager(game_time), 1: TimeManager(game_time)} if game_time is not None else None
+    while not position.is_game_complete():
+        legal = position.legal_moves()
         if len(legal) == 0:
-            board.apply_pass()
+            position = position.pass_move()
+            _advance_trees(trees.values())
             continue
 
-        mcts = MCTS(board, iter_max=iters, verbose=True)
-        search = mcts.search()
+        mcts = trees[position.current_player]
+        if clocks is not None:
+            search = clocks[position.current_player].search(mcts, position)
+        else:
+            search = mcts.search()
 
         if search is None:
-            board.apply_pass()
+            position = position.pass_move()
+            _advance_trees(trees.values())
             continue
 
-        logger.info(f'{board.current_player} plays {search}')
-        board.apply_move(search)
-        board.print()
+        logger.info(f'{position.current_player} plays {search}')
+        position = position.play(search)
+        _advance_trees(trees.values(), search)
+        position.print()
 
 
 def play_mcts_against_weak_mcts(strong_iters=500, weak_iters=100, strong_color=1):
-    board = GameBoard(BitBoard(strong_color), BitBoard(-strong_color))
-    while not board.is_game_complete():
-        legal = board.legal_moves(board.current_player)
+    position = Position()
+    strong = MCTS(position, iter_max=strong_iters, verbose=True)
+    weak = MCTS(position, iter_max=weak_iters, verbose=True)
+    while not position.is_game_complete():
+        legal = position.legal_moves()
         if len(legal) == 0:
-            board.apply_pass()
+            position = position.pass_move()
+            _advance_trees([strong, weak])
             continue
 
-        if board.current_player == strong_color:
-            mcts = MCTS(board, iter_max=strong_iters, verbose=True)
-            search = mcts.search()
-            logger.info(f'(strong) {board.current_player} plays {search}')
+        if position.current_player == strong_color:
+            search = strong.search()
+            logger.info(f'(strong) {position.current_player} plays {search}')
 
             if search is None:
-                board.apply_pass()
-                logger.info('(strong) {board.current_player} passed')
+                position = position.pass_move()
+                _advance_trees([strong, weak])
+                logger.info('(strong) {position.current_player} passed')
                 continue
 
-            board.apply_move(search)
-            board.print()
+            position = position.play(search)
+            _advance_trees([strong, weak], search)
+            position.print()
         else:
             # Weak MCTS
-            mcts = MCTS(board, iter_max=weak_iters, verbose=True)
-            search = mcts.search()
-            logger.info(f'(weak) {board.current_player} plays {search}')
+            search = weak.search()
+            logger.info(f'(weak) {position.current_player} plays {search}')
 
             if search is None:
-                board.apply_pass()
-                logger.info('(weak) {board.current_player} passed')
+                position = position.pass_move()
+                _advance_trees([strong, weak])
+                logger.info('(weak) {position.current_player} passed')
                 continue
 
-            board.apply_move(search)
-            board.print()
+            position = position.play(search)
+            _advance_trees([strong, weak], search)
+            position.print()
 
     logger.info(
-        f'Score: {board.player_board.bitcount()} {board.player_board.color} (strong) | {board.opp_board.color} (weak) {board.opp_board.bitcount()}')
+        f'Score: {position.count_pieces(strong_color)} {strong_color} (strong) | {-strong_color} (weak) {position.count_pieces(-strong_color)}')
 
 
 def play_mcts_vs_random(iters=350, agent_color=1):
-    board = GameBoard(BitBoard(agent_color), BitBoard(-agent_color))
-    while not board.is_game_complete():
-        legal = board.legal_moves(board.current_player)
+    position = Position()
+    mcts = MCTS(position, iter_max=iters, verbose=True)
+    while not position.is_game_complete():
+        legal = position.legal_moves()
         if len(legal) == 0:
-            board.apply_pass()
+            position = position.pass_move()
+            mcts.advance()
             continue
 
-        if board.current_player == agent_color:
-            mcts = MCTS(board, iter_max=iters, verbose=True)
+        if position.current_player == agent_color:
             search = mcts.search()
-            logger.info(f'{board.current_player} plays {search}')
+            logger.info(f'{position.current_player} plays {search}')
 
             if search is None:
-                board.apply_pass()
-                logger.info(f'{board.current_player} passed')
+                position = position.pass_move()
+                mcts.advance()
+                logger.info(f'{position.current_player} passed')
                 continue
 
-            board.apply_move(search)
-            board.print()
+            position = position.play(search)
+            mcts.advance(search)
+            position.print()
         else:
             # Random
             if len(legal) == 0:
-                board.apply_pass()
-                logger.info(f'{board.current_player} passed')
+                position = position.pass_move()
+                mcts.advance()
+                logger.info(f'{position.current_player} passed')
                 continue
 
             r_move = random.choice(legal)
-            logger.info(f'{board.current_player} plays {r_move}')
-            board.apply_move(r_move)
-            board.print()
+            logger.info(f'{position.current_player} plays {r_move}')
+            position = position.play(r_move)
+            mcts.advance(r_move)
+            position.print()
 
-    logger.info(f'Score: {board.player_board.bitcount()} {board.player_board.color} (agent) | {board.opp_board.color} '
-                f'(random) {board.opp_board.bitcount()}')
+    logger.info(f'Score: {position.count_pieces(agent_color)} {agent_color} (agent) | {-agent_color} '
+                f'(random) {position.count_pieces(-agent_color)}')
 
 
-def play_mcts_interactive(display_legal=True, iterations=1200, mcts_verbose=False, assistance=False,
+def play_mcts_interactive(display_legal=True, iterations=None, mcts_verbose=False, assistance=False,
                           assistance_iters=650):
+    """
+    :param iterations: Iterations per agent move. None plays on a clock of --ai_game_time seconds
+    """
     logger.info('Specify color to play as... [1 for white, -1 for black]')
     color = int(input())
 
-    # player_board = human, opp = agent
-    board = GameBoard(BitBoard(color), BitBoard(-color))
+    position = Position()
+    mcts = MCTS(position, iterations, mcts_verbose)
+    clock = TimeManager(cfg.ai_game_time) if iterations is None else None
 
-    while not board.is_game_complete():
-        legal = board.legal_moves(board.current_player)
+    while not position.is_game_complete():
+        legal = position.legal_moves()
         if len(legal) == 0:
-            board.apply_pass()
-            logger.info(f'{board.current_player} passed (forced)')
+            position = position.pass_move()
+            mcts.advance()
+            logger.info(f'{position.current_player} passed (forced)')
             continue
 
         # Agent plays MCTS
-        if board.current_player == -board.player_board.color:
-            mcts = MCTS(board, iterations, mcts_verbose)
+        if position.current_player == -color:
             logger.info('Agent searching...')
-            search = mcts.search()
-            logger.info(f'{board.current_player} plays {search}')
+            search = clock.search(mcts, position) if clock is not None else mcts.search()
+            logger.info(f'{position.current_player} plays {search}')
 
             if search is None:
-                board.apply_pass()
+                position = position.pass_move()
+                mcts.advance()
                 logger.info('Black passed')
                 continue
 
-            board.apply_move(search)
+            position = position.play(search)
+            mcts.advance(search)
         else:
             if display_legal:
                 logger.info(f'Legal moves: {legal}')
             if assistance:
-                mcts_player_assistance(assistance_iters, board)
+                mcts_player_assistance(assistance_iters, position)
 
-            board.print()
+            position.print()
             # Interactive
             logger.info('Specify move... [e.g. a1, b2], or have agent help you with "help"')
 
@@ -189,65 +231,190 @@ def play_mcts_interactive(display_legal=True, iterations=1200, mcts_verbose=Fals
             while not valid:
                 move = input()
                 if move == 'help':
-                    mcts_player_assistance(assistance_iters, board)
+                    mcts_player_assistance(assistance_iters, position)
                     continue
                 try:
-                    interactive_move = Move(board.current_player, move)
+                    interactive_move = Move(position.current_player, move)
                     if interactive_move.pos not in [x.pos for x in legal]:
                         logger.info('Invalid move, please try again... [e.g. a1, b2]')
                         continue
                     valid = True
                 except ValueError:
                     if move == 'help':
-                        mcts_player_assistance(assistance_iters, board)
+                        mcts_player_assistance(assistance_iters, position)
                     logger.info('Invalid move, please try again... [e.g. a1, b2]')
                     continue
 
-            board.apply_move(interactive_move)
-            logger.info(f'{board.current_player} plays {interactive_move}')
-            board.print()
+            position = position.play(interactive_move)
+            mcts.advance(interactive_move)
+            logger.info(f'{position.current_player} plays {interactive_move}')
+            position.print()
+
+    logger.info(f'Score: {position.count_pieces(color)} (human [{color}]) | '
+                f'(agent [{-color}) {position.count_pieces(-color)}')
+
+
+def benchmark_tree_parallel(threads=4, processes=0, iters=400, games=10, move_time=0.5, rollout_batch=1):
+    """Compares TreeParallelMCTS with the serial MCTS: iterations per second on the opening
+    position, then win rate of tree-parallel over serial with equal time per move and alternating colors."""
+    parallel = TreeParallelMCTS(Position(), iter_max=iters, threads=threads, processes=processes,
+                                rollout_batch=rollout_batch)
+    for name, mcts in (('serial', MCTS(Position(), iter_max=iters)), ('tree-parallel', parallel)):
+        start = time.perf_counter()
+        mcts.search()
+        elapsed = time.perf_counter() - start
+        logger.info(f'{name}: {iters / elapsed:.1f} iterations/s, {mcts.root.visits / elapsed:.1f} rollouts/s')
+    parallel.close()
+
+    parallel_wins = 0
+    for g in range(games):
+        parallel_color = -1 if g % 2 == 0 else 1
+        position = Position()
+        trees = {parallel_color: TreeParallelMCTS(position, iter_max=None, threads=threads, processes=processes,
+                                                  rollout_batch=rollout_batch),
+                 -parallel_color: MCTS(position, iter_max=None)}
+        while not position.is_game_complete():
+            if position.legal_mask() == 0:
+                position = position.pass_move()
+                _advance_trees(trees.values())
+                continue
+
+            search = trees[position.current_player].search(time_limit=move_time)
+            position = position.play(search)
+            _advance_trees(trees.values(), search)
+
+        trees[parallel_color].close()
+        parallel_wins += position.winner() == parallel_color
+        logger.info(f'Game {g + 1}: tree-parallel ({parallel_color}) {position.count_pieces(parallel_color)} | '
+                    f'{position.count_pieces(-parallel_color)} serial')
+
+    logger.info(f'Tree-parallel won {parallel_wins}/{games} games against serial')
+
+
+def compare_nn_mcts(games=10, move_time=0.5, batch_size=32, rollout_mix=0.0, model_path='model.h5'):
+    """Plays NNMCTS against rollout MCTS with equal time per move and alternating colors, and reports
+    the strength of each per CPU-second: win rate, CPU seconds per move and leaf evaluations per CPU-second.
+    CPU time is measured with time.process_time, so threads started by TensorFlow are charged to the network.
+    model_path may point to model.h5 (TensorFlow) or to weights exported by nn_numpy.export_weights (NumPy)."""
+    evaluator = load_evaluator(model_path)
+    cpu = {'nn': 0.0, 'rollout': 0.0}
+    evaluations = {'nn': 0, 'rollout': 0}
+    moves = {'nn': 0, 'rollout': 0}
+
+    nn_wins = 0
+    for g in range(games):
+        nn_color = -1 if g % 2 == 0 else 1
+        position = Position()
+        trees = {nn_color: NNMCTS(position, evaluator, iter_max=None, batch_size=batch_size, rollout_mix=rollout_mix),
+                 -nn_color: MCTS(position, iter_max=None)}
+        while not position.is_game_complete():
+            if position.legal_mask() == 0:
+                position = position.pass_move()
+                _advance_trees(trees.values())
+                continue
+
+            name = 'nn' if position.current_player == nn_color else 'rollout'
+            tree = trees[position.current_player]
+            visits = tree.root.visits
+            start = time.process_time()
+            search = tree.search(time_limit=move_time)
+            cpu[name] += time.process_time() - start
+            evaluations[name] += tree.root.visits - visits
+            moves[name] += 1
+
+            position = position.play(search)
+            _advance_trees(trees.values(), search)
+
+        nn_wins += position.winner() == nn_color
+        logger.info(f'Game {g + 1}: nn ({nn_color}) {position.count_pieces(nn_color)} | '
+                    f'{position.count_pieces(-nn_color)} rollout')
+
+    for name in ('nn', 'rollout'):
+        logger.info(f'{name}: {cpu[name] / max(moves[name], 1):.3f} CPU s/move, '
+                    f'{evaluations[name] / max(cpu[name], 1e-9):.1f} evaluations/CPU s')
+    logger.info(f'NNMCTS won {nn_wins}/{games} games against rollout MCTS '
+                f'(batch_size={batch_size}, rollout_mix={rollout_mix})')
+
+
+_worker_evaluator = None
+
+
+def _install_evaluator(evaluator):
+    """Pool initializer. A path is loaded by the worker itself, so every worker holds its own network."""
+    global _worker_evaluator
+    _worker_evaluator = load_evaluator(evaluator) if isinstance(evaluator, str) else evaluator
+
 
-    logger.info(f'Score: {board.player_board.bitcount()} (human [{board.player_board.color}]) | '
-                f'(agent [{board.opp_board.color}) {board.opp_board.bitcount()}')
+def _nn_search(iters, seed):
+    random.seed(seed)
+    return NNMCTS(Position(), _worker_evaluator, iter_max=iters).search().pos
 
 
-def mcts_save_data(iters=1600) -> []:
-    """Save data from MCTS games to file. Alternates random play between players each game
-    to maximize saved data."""
+def benchmark_inference_server(workers=4, searches=16, iters=400, model_path='model.npz'):
+    """Runs NNMCTS searches in a pool of workers, first with a network loaded by every worker, then
+    with one InferenceServer batching the requests of all workers, and logs the time taken and the server metrics.
+    model_path may be model.h5 or weights exported by nn_numpy.export_weights."""
+    args = [(iters, seed) for seed in range(searches)]
+
+    start = time.perf_counter()
+    with Pool(workers, initializer=_install_evaluator, initargs=(model_path,)) as pool:
+        pool.starmap(_nn_search, args)
+    logger.info(f'Per-worker networks: {searches} searches in {time.perf_counter() - start:.2f} s')
+
+    with InferenceServer(model_path, clients=workers) as server:
+        start = time.perf_counter()
+        with Pool(workers, initializer=_install_evaluator, initargs=(server.client(),)) as pool:
+            pool.starmap(_nn_search, args)
+        logger.info(f'Inference server: {searches} searches in {time.perf_counter() - start:.2f} s')
+        logger.info(server.metrics())
+
+
+def mcts_save_data(iters=1600, eval_cache=None, writer: ShardWriter = None, index: RecordIndex = None) -> int:
+    """Plays one MCTS game per color and streams every searched state not saved yet to a shard.
+    Alternates random play between players each game to maximize saved data.
+    :param eval_cache: Rollout cache for the searches. Defaults to the cache installed in this process, if any
+    :param writer: Shard to append to, shard 0 by default
+    :param index: Saved positions to skip, by default the main record file and all shards
+    :return: Number of states saved"""
     logger.info(f'Starting MCTS save_data session with {iters} iterations')
     random_player = 1
 
-    decoder = StateSaveDecoder()
-    logger.info('Loading previously stored data...')
-    game_data = decoder.data if decoder.data is not None else []
-    logger.info(f'Loaded {len(game_data)} states')
+    if writer is None:
+        writer = ShardWriter()
+    if index is None:
+        index = RecordIndex.load()
+    logger.info(f'Loaded {len(index)} stored states')
+    saved = 0
 
-    while True:
-        board = GameBoard(BitBoard(-1), BitBoard(1))
+    if eval_cache is None:
+        eval_cache = ec.installed()
+
+    try:
+        while True:
+            position = Position()
 
-        logger.info('Starting new game...')
-        move_count = 1
-        try:
-            while not board.is_game_complete():
-                legal = board.legal_moves(board.current_player)
+            logger.info('Starting new game...')
+            move_count = 1
+            while not position.is_game_complete():
+                legal = position.legal_moves()
                 if len(legal) == 0:
-                    board.apply_pass()
+                    position = position.pass_move()
                     continue
 
-                if board.current_player == random_player:
+                if position.current_player == random_player:
                     r_move = random.choice(legal)
-                    logger.info(f'{board.current_player} plays {r_move} (random)')
-                    board.apply_move(r_move)
+                    logger.info(f'{position.current_player} plays {r_move} (random)')
+                    position = position.play(r_move)
                     continue
 
-                current = decoder.find_best_move(board.player_board.bits, board.opp_board.bits, board.current_player)
+                current = index.find_best_move(position.black, position.white, position.current_player)
                 if isinstance(current, SavedMoveData):
                     logger.info(f'Found save for move {move_count}, skipping...')
-                    board.apply_move(Move(board.current_player, current.pos))
+                    position = position.play(Move(position.current_player, current.pos))
                     move_count += 1
                     continue
 
-                mcts = MCTS(board, iter_max=iters, verbose=False)
+                mcts = MCTS(position, iter_max=iters, verbose=False, eval_cache=eval_cache)
                 search_nodes = mcts.search(return_nodes=True)
 
                 # player must be black and opp must be white
@@ -256,13 +423,15 @@ def mcts_save_data(iters=1600) -> []:
                     saves.append(SavedMoveData(node.move.pos, node.move.pos_to_str(), node.wins, node.visits,
                                                node.wins / node.visits))
 
-                state_save = StateSave(board.player_board.bits, board.opp_board.bits, board.current_player, saves)
-                game_data.append(state_save.to_json())
+                record = records.from_state(StateSave(position.black, position.white, position.current_player, saves))
+                writer.write(record)
+                index.add(record)
+                saved += 1
 
                 best = search_nodes[0].move
 
-                logger.info(f'{board.current_player} plays {best}')
-                board.apply_move(best)
+                logger.info(f'{position.current_player} plays {best}')
+                position = position.play(best)
                 move_count += 1
 
             random_player = -random_player
@@ -270,47 +439,45 @@ def mcts_save_data(iters=1600) -> []:
             # If we are starting a new game, end here. We complete 1 game per color in this function.
             if random_player == 1:
                 logger.info('Exiting save_data session')
-                return game_data
-        except:
-            logger.exception('Aborting...')
-            return game_data
+                return saved
+    except:
+        logger.exception('Aborting...')
+        return saved
+    finally:
+        writer.flush()
 
 
+def _save_data_worker(iters, worker_id, directory, data_path):
+    with ShardWriter(directory, worker_id) as writer:
+        return mcts_save_data(iters, writer=writer, index=RecordIndex.load(directory, data_path))
 
-def _save_data_json(game_data):
-    with open('data.json', 'w') as f:
-        json.dump(game_data, f, indent=4)
 
-
-def save_data_multiprocessing(iters=1600):
+def save_data_multiprocessing(iters=1600, cache_size=1 << 20, directory=shards.SHARD_DIR, data_path=shards.DATA_PATH):
+    """
+    Runs one mcts_save_data session per CPU. Workers stream to their own shard, which are merged into
+    data_path once all workers are done. Shards left by an interrupted run are resumed by the worker
+    with the same id and merged at the end of this run.
+    :param cache_size: Slots of the rollout cache shared by the workers, 0 to disable it
+    :param directory: Directory of the shards
+    :param data_path: Main record file. Created from positions.jsonl or data.json on the first run
+    """
+    shards.migrate_json(data_path)
     n_processes = multiprocessing.cpu_count()
-    pool = Pool(processes=n_processes)
-
-    results = []
-    for i in range(n_processes):
-        results.append(pool.apply_async(mcts_save_data, args=(iters,)))
-
-    pool.close()
-    pool.join()
-
-    final_data = []
+    cache = ec.SharedEvalCache(cache_size) if cache_size > 0 else None
 
-    for r in results:
-        game_data = r.get()
-        logger.info(f'Found {len(game_data)} states to save')
-        for d in game_data:
-            if d not in final_data:
-                final_data.append(d)
+    with Pool(processes=n_processes, initializer=ec.install, initargs=(cache,)) as pool:
+        saved = pool.starmap(_save_data_worker, [(iters, i, directory, data_path) for i in range(n_processes)])
 
+    if cache is not None:
+        logger.info(cache)
 
-    logger.info(f'Final data size: {len(final_data)} states')
-    _save_data_json(final_data)
-    logger.info('Saved data to file')
+    total = shards.compact(directory, data_path)
+    logger.info(f'Saved {sum(saved)} new states, {total} states in total')
 
 
-def mcts_player_assistance(assistance_iters, board):
+def mcts_player_assistance(assistance_iters, position):
     logger.info('Player assistance processing...')
-    mcts = MCTS(board, assistance_iters, False)
+    mcts = MCTS(position, assistance_iters, False)
     search = mcts.search()
     logger.info(f'Agent recommends: {search}')
 
@@ -325,5 +492,36 @@ def gather_data():
         i += 1
 
 
+def run_pipeline(generations=None):
+    """Call this function as main to generate data, train and gate new networks continuously."""
+    Pipeline().run(generations)
+
+
+def run_arena(games=200, strong_iters=500, weak_iters=100, workers=None, model_path=None):
+    """
+    Headless counterpart of play_mcts_against_weak_mcts and play_mcts_vs_random: plays matches over a
+    process pool and logs win rates with confidence intervals and Elo differences.
+    :param model_path: Also plays an NN-guided agent with this network when given
+    """
+    strong = MCTSAgent(strong_iters)
+    opponents = [MCTSAgent(weak_iters), RandomAgent()]
+    if model_path is not None:
+        opponents.append(NNAgent(model_path, strong_iters))
+
+    with Pool(workers or multiprocessing.cpu_count()) as pool:
+        arena = Arena(workers)
+        for opponent in opponents:
+            arena.match(strong, opponent, games, pool=pool)
+
+
+def run_sprt(move_time=0.1, iters=300, games=2000, elo0=0, elo1=10, workers=None):
+    """
+    SPRT of MCTS on a move_time clock against MCTS at a fixed iteration count. Speedups let the timed
+    agent search more, so a performance change shows up as a shift of the score between runs.
+    Stops as soon as the test accepts elo0 (H0) or elo1 (H1).
+    """
+    Arena(workers).match(MCTSAgent(None, time_limit=move_time), MCTSAgent(iters), games, sprt=SPRT(elo0, elo1))
+
+
 if __name__ == '__main__':
     nn.load_and_test()
\ No newline at end of file
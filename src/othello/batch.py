@@ -0,0 +1,116 @@
+import numpy as np
+
+from src.othello.game_logic import DIRECTION_COUNT, DIR_INCREMENTS, DIR_MASKS
+
+# Shift amounts as np.uint64 so uint64 arrays are never promoted to float
+_SHIFTS = [np.uint64(abs(int(d))) for d in DIR_INCREMENTS]
+_ZERO = np.uint64(0)
+_ONE = np.uint64(1)
+SQUARE_BITS = np.left_shift(_ONE, np.arange(64, dtype=np.uint64))
+
+
+def _shift(x: np.ndarray, i: int) -> np.ndarray:
+    """Shifts every board in x one step in direction i, masking off wrapped bits"""
+    if DIR_INCREMENTS[i] > 0:
+        return np.left_shift(x, _SHIFTS[i]) & DIR_MASKS[i]
+    return np.right_shift(x, _SHIFTS[i]) & DIR_MASKS[i]
+
+
+def as_bits(boards) -> np.ndarray:
+    """Converts a sequence of boards (ints or np.uint64) into a uint64 array"""
+    return np.asarray(boards, dtype=np.uint64)
+
+
+def square_bits(squares) -> np.ndarray:
+    """
+    Converts square indices into single-bit masks.
+    :param squares: Array of squares, 0 to 63 inclusive. Negative squares (passes) map to 0
+    :return: uint64 array of the same shape
+    """
+    squares = np.asarray(squares, dtype=np.int64)
+    return np.where(squares >= 0, SQUARE_BITS[np.clip(squares, 0, 63)], _ZERO)
+
+
+def unpack(x: np.ndarray) -> np.ndarray:
+    """Unpacks a uint64 array of shape (N,) into a boolean array of shape (N, 64) indexed by square"""
+    return (as_bits(x)[..., None] & SQUARE_BITS) != 0
+
+
+def move_masks(p: np.ndarray, o: np.ndarray) -> np.ndarray:
+    """
+    Generates legal move masks for N boards at once.
+    :param p: uint64 array of shape (N,) holding the bits of the player to move
+    :param o: uint64 array of shape (N,) holding the bits of the opponent
+    :return: uint64 array of shape (N,) with the legal move mask of each board
+    """
+    p = as_bits(p)
+    o = as_bits(o)
+    empty = ~(p | o)
+    moves = np.zeros(np.broadcast(p, o).shape, dtype=np.uint64)
+
+    for i in range(DIRECTION_COUNT):
+        x = _shift(p, i) & o
+        for _ in range(5):
+            x |= _shift(x, i) & o
+        moves |= _shift(x, i) & empty
+
+    return moves
+
+
+def flip_masks(p: np.ndarray, o: np.ndarray, moves: np.ndarray) -> np.ndarray:
+    """
+    Computes the discs flipped by one move on each of N boards.
+    :param p: uint64 array of the bits of the player making the move
+    :param o: uint64 array of the bits of the opponent
+    :param moves: uint64 array of single-bit move masks. A 0 entry (pass) flips nothing
+    :return: uint64 array of flipped discs, broadcast over the inputs
+    """
+    p = as_bits(p)
+    o = as_bits(o)
+    moves = as_bits(moves)
+    flips = np.zeros(np.broadcast(p, o, moves).shape, dtype=np.uint64)
+
+    for i in range(DIRECTION_COUNT):
+        x = _shift(moves, i) & o
+        for _ in range(5):
+            x |= _shift(x, i) & o
+        bounded = (_shift(x, i) & p) != 0
+        flips |= np.where(bounded, x, _ZERO)
+
+    return flips
+
+
+def play(p: np.ndarray, o: np.ndarray, moves: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Applies one move on each of N boards. Moves are not checked for legality.
+    :param p: uint64 array of the bits of the player making the move
+    :param o: uint64 array of the bits of the opponent
+    :param moves: uint64 array of single-bit move masks. A 0 entry leaves that board unchanged (pass)
+    :return: (p_next, o_next), the bits of the mover and the opponent after the move
+    """
+    p = as_bits(p)
+    o = as_bits(o)
+    moves = as_bits(moves)
+    flips = flip_masks(p, o, moves)
+    return p | moves | flips, o & ~flips
+
+
+def expand(p: np.ndarray, o: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Generates every child of N boards in one call.
+    :param p: uint64 array of shape (N,) holding the bits of the player to move
+    :param o: uint64 array of shape (N,) holding the bits of the opponent
+    :return: (moves, flips, p_next, o_next). moves has shape (N,). flips, p_next and o_next have
+    shape (N, 64) and are indexed by square; entries for illegal squares are 0.
+    """
+    p = as_bits(p)
+    o = as_bits(o)
+    moves = move_masks(p, o)
+    legal = (moves[:, None] & SQUARE_BITS[None, :]) != 0
+    candidates = np.where(legal, SQUARE_BITS[None, :], _ZERO)
+
+    flips = flip_masks(p[:, None], o[:, None], candidates)
+    p_next = np.where(legal, p[:, None] | candidates | flips, _ZERO)
+    o_next = np.where(legal, o[:, None] & ~flips, _ZERO)
+
+    return moves, flips, p_next, o_next
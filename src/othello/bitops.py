@@ -0,0 +1,124 @@
+"""
+Pure Python int bitboard kernels.
+
+Boards are plain ints holding 64 bits, laid out exactly like the np.uint64
+boards in game_logic (bit 63 is a1, bit 0 is h8). Python ints avoid the ufunc
+dispatch and scalar allocation of NumPy for every shift and mask, which is
+what dominates move generation on single positions.
+"""
+import random
+
+FULL = 0xFFFFFFFFFFFFFFFF
+
+# (shift, destination mask) pairs from DIR_INCREMENTS / DIR_MASKS, split by shift direction
+LEFT_DIRS = (
+    (8, 0xFFFFFFFFFFFFFF00),  # North
+    (9, 0xFEFEFEFEFEFEFE00),  # NorthWest
+    (1, 0xFEFEFEFEFEFEFEFE),  # West
+    (7, 0x7F7F7F7F7F7F7F00),  # NorthEast
+)
+RIGHT_DIRS = (
+    (7, 0x00FEFEFEFEFEFEFE),  # SouthWest
+    (8, 0x00FFFFFFFFFFFFFF),  # South
+    (9, 0x007F7F7F7F7F7F7F),  # SouthEast
+    (1, 0x7F7F7F7F7F7F7F7F),  # East
+)
+
+
+def move_mask(p: int, o: int) -> int:
+    """
+    Generates the legal move mask for player p against opponent o using a
+    Kogge-Stone occluded fill in each of the 8 directions.
+    :param p: Bits of the player to move
+    :param o: Bits of the opponent
+    :return: Mask of all empty squares that flip at least one opponent disc
+    """
+    empty = ~(p | o) & FULL
+    moves = 0
+
+    for d, m in LEFT_DIRS:
+        pro = o & m
+        gen = p
+        gen |= pro & (gen << d)
+        pro &= pro << d
+        gen |= pro & (gen << (d << 1))
+        pro &= pro << (d << 1)
+        gen |= pro & (gen << (d << 2))
+        moves |= ((gen & o) << d) & m
+
+    for d, m in RIGHT_DIRS:
+        pro = o & m
+        gen = p
+        gen |= pro & (gen >> d)
+        pro &= pro >> d
+        gen |= pro & (gen >> (d << 1))
+        pro &= pro >> (d << 1)
+        gen |= pro & (gen >> (d << 2))
+        moves |= ((gen & o) >> d) & m
+
+    return moves & empty
+
+
+def flip_mask(p: int, o: int, pos: int) -> int:
+    """
+    Computes the discs flipped when player p plays at pos, using a dumb7fill
+    walk out from the move square in each direction.
+    :param p: Bits of the player making the move
+    :param o: Bits of the opponent
+    :param pos: Square being played, 0 to 63 inclusive
+    :return: Mask of opponent discs captured by the move
+    """
+    move = 1 << pos
+    flips = 0
+
+    for d, m in LEFT_DIRS:
+        x = (move << d) & m & o
+        x |= (x << d) & m & o
+        x |= (x << d) & m & o
+        x |= (x << d) & m & o
+        x |= (x << d) & m & o
+        x |= (x << d) & m & o
+        if (x << d) & m & p:
+            flips |= x
+
+    for d, m in RIGHT_DIRS:
+        x = (move >> d) & m & o
+        x |= (x >> d) & m & o
+        x |= (x >> d) & m & o
+        x |= (x >> d) & m & o
+        x |= (x >> d) & m & o
+        x |= (x >> d) & m & o
+        if (x >> d) & m & p:
+            flips |= x
+
+    return flips
+
+
+def lowest_square(mask: int) -> int:
+    """Returns the square of the lowest set bit, or -1 for an empty mask"""
+    return (mask & -mask).bit_length() - 1
+
+
+def iter_squares(mask: int):
+    """Yields the square of every set bit, lowest first"""
+    while mask:
+        lsb = mask & -mask
+        yield lsb.bit_length() - 1
+        mask ^= lsb
+
+
+def nth_square(mask: int, n: int) -> int:
+    """Returns the square of the n-th lowest set bit (0-based)"""
+    for _ in range(n):
+        mask &= mask - 1
+    return lowest_square(mask)
+
+
+def random_square(mask: int, rng=random) -> int:
+    """
+    Picks a set bit uniformly at random.
+    :param mask: Non-empty mask
+    :param rng: Object providing randrange, defaults to the random module
+    :return: The chosen square
+    """
+    return nth_square(mask, rng.randrange(mask.bit_count()))
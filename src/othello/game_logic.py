@@ -1,6 +1,7 @@
 import numpy as np
 
 from src.core.logger import logger
+from src.othello import bitops, scoring
 
 WHITE = 1
 BLACK = -1
@@ -22,6 +23,11 @@ DIR_MASKS = np.array([
     0x7F7F7F7F7F7F7F00  # NorthEast
 ], dtype=np.uint64)
 
+# Move generation backends for GameBoard. 'int' runs on plain Python ints (src.othello.bitops),
+# 'numpy' is the original np.uint64 implementation. Both produce identical bits.
+BACKENDS = ('int', 'numpy')
+DEFAULT_BACKEND = 'int'
+
 
 def opposite(c):
     if c == BLACK:
@@ -110,7 +116,7 @@ class BitBoard:
         self.bits &= ~mask
 
     def bitcount(self):
-        return self.binary_repr().count('1')
+        return scoring.popcount(self.bits)
 
     def binary_repr(self) -> str:
         return np.binary_repr(self.bits, 64)
@@ -123,32 +129,34 @@ class BitBoard:
 
 
 class GameBoard:
-    def __init__(self, player_board: BitBoard, opp_board: BitBoard):
+    def __init__(self, player_board: BitBoard, opp_board: BitBoard, backend: str = None):
+        """
+        :param player_board: Bitboard of the player
+        :param opp_board: Bitboard of the opponent
+        :param backend: Move generation backend, one of BACKENDS. Defaults to DEFAULT_BACKEND
+        """
+        if backend is None:
+            backend = DEFAULT_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f'Backend must be one of {BACKENDS}. Received {backend}')
+
         self.p_color = player_board.color
         self.o_color = opp_board.color
         self.player_board = player_board
         self.opp_board = opp_board
         self.current_player = -1  # Black moves first
+        self.backend = backend
 
     def __repr__(self):
         return f'GameBoard(player_board={self.player_board}, opp_board={self.opp_board})'
 
     def legal_moves(self, c):
         """Returns a list of all possible moves for the given bitboard"""
-        r = []
-        bb = self.get_bitboard(c)
-        op_bb = self.get_bitboard(-c)
-        move_mask = self._generate_move_mask(bb, op_bb)
+        return [Move(c, i) for i in bitops.iter_squares(self.legal_mask(c))]
 
-        if move_mask == 0:
-            return r
-
-        for i in range(64):
-            mask = np.uint64(1 << i)
-            if (mask & move_mask) != 0:
-                r.append(Move(bb.color, i))
-
-        return r
+    def legal_mask(self, c) -> int:
+        """Returns the legal moves for the given color as a 64-bit int mask"""
+        return int(self._generate_move_mask(self.get_bitboard(c), self.get_bitboard(-c)))
 
     def get_bitboard(self, c):
         """
@@ -202,6 +210,9 @@ class GameBoard:
         return (p_legal == 0 and o_legal == 0) or (p_bits | o_bits) == UNIVERSE
 
     def _generate_move_mask(self, p, o):
+        if self.backend == 'int':
+            return np.uint64(bitops.move_mask(int(p.bits), int(o.bits)))
+
         empty_mask = ~(p.bits | o.bits)
         move_mask = np.uint64(0)
 
@@ -231,6 +242,9 @@ class GameBoard:
         return move_mask
 
     def _line_cap(self, move: Move):
+        if self.backend == 'int':
+            return self._line_cap_int(move)
+
         pos = np.uint64(move.pos)
         p_board = self.get_bitboard(move.color)
         opp_board = self.get_bitboard(opposite(move.color))
@@ -268,6 +282,20 @@ class GameBoard:
         self._set_for_color(p_board)
         self._set_for_color(opp_board)
 
+    def _line_cap_int(self, move: Move):
+        p_board = self.get_bitboard(move.color)
+        opp_board = self.get_bitboard(opposite(move.color))
+
+        p_bits = int(p_board.bits)
+        o_bits = int(opp_board.bits)
+        f_fin = bitops.flip_mask(p_bits, o_bits, move.pos) if 0 <= move.pos <= 63 else 0
+
+        p_board.bits = np.uint64(p_bits | f_fin)
+        opp_board.bits = np.uint64(o_bits & ~f_fin)
+
+        self._set_for_color(p_board)
+        self._set_for_color(opp_board)
+
     def _get_opposite_board(self, b: BitBoard):
         if b.color == self.p_color:
             return self.opp_board
@@ -282,7 +310,7 @@ class GameBoard:
         return hold_mask
 
     def count_pieces(self, c):
-        return int(self.get_bitboard(c).bits.count('1'))
+        return scoring.popcount(self.get_bitboard(c).bits)
 
     def _set_for_color(self, b: BitBoard):
         """Updates bitboard based on color"""
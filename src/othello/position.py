@@ -0,0 +1,122 @@
+import numpy as np
+
+from src.othello import bitops, scoring
+from src.othello.game_logic import GameBoard, BitBoard, Move, BLACK, WHITE, BLACK_BITS, WHITE_BITS
+
+
+class Position:
+    """
+    Compact, immutable game state: black bits, white bits and the color to move.
+    Bits are plain Python ints. Moves return a new Position instead of mutating,
+    so positions can be shared between search nodes without copying.
+    """
+    __slots__ = ('black', 'white', 'current_player')
+
+    def __init__(self, black: int = int(BLACK_BITS), white: int = int(WHITE_BITS), current_player: int = BLACK):
+        object.__setattr__(self, 'black', int(black))
+        object.__setattr__(self, 'white', int(white))
+        object.__setattr__(self, 'current_player', current_player)
+
+    def __setattr__(self, key, value):
+        raise AttributeError('Position is immutable')
+
+    def __repr__(self):
+        return f'Position(black={self.black}, white={self.white}, current_player={self.current_player})'
+
+    def __eq__(self, other):
+        return isinstance(other, Position) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __reduce__(self):
+        return Position, self.key()
+
+    def key(self) -> tuple[int, int, int]:
+        return self.black, self.white, self.current_player
+
+    @classmethod
+    def from_board(cls, board: GameBoard):
+        return cls(int(board.get_bitboard(BLACK).bits), int(board.get_bitboard(WHITE).bits), board.current_player)
+
+    def to_board(self, p_color: int = BLACK) -> GameBoard:
+        """
+        Builds a mutable GameBoard holding this position.
+        :param p_color: Color of the GameBoard's player_board
+        """
+        player_board = BitBoard(p_color)
+        opp_board = BitBoard(-p_color)
+        player_board.bits = np.uint64(self.get_bits(p_color))
+        opp_board.bits = np.uint64(self.get_bits(-p_color))
+
+        board = GameBoard(player_board, opp_board)
+        board.current_player = self.current_player
+        return board
+
+    def copy(self):
+        return Position(self.black, self.white, self.current_player)
+
+    def get_bits(self, c: int) -> int:
+        return self.black if c == BLACK else self.white
+
+    @property
+    def player_bits(self) -> int:
+        """Bits of the color to move"""
+        return self.get_bits(self.current_player)
+
+    @property
+    def opp_bits(self) -> int:
+        """Bits of the color waiting to move"""
+        return self.get_bits(-self.current_player)
+
+    def legal_mask(self, c: int = None) -> int:
+        """Returns the legal move mask for the given color, defaulting to the color to move"""
+        if c is None:
+            c = self.current_player
+        return bitops.move_mask(self.get_bits(c), self.get_bits(-c))
+
+    def legal_moves(self, c: int = None) -> list[Move]:
+        """Returns a list of all possible moves for the given color, defaulting to the color to move"""
+        if c is None:
+            c = self.current_player
+        return [Move(c, i) for i in bitops.iter_squares(self.legal_mask(c))]
+
+    def play(self, move: Move | int):
+        """
+        Plays a move for the color to move. The move is not checked for legality.
+        :param move: Move or square, 0 to 63 inclusive
+        :return: The resulting Position
+        """
+        pos = move.pos if isinstance(move, Move) else move
+        p = self.player_bits
+        o = self.opp_bits
+        flips = bitops.flip_mask(p, o, pos)
+        p |= (1 << pos) | flips
+        o &= ~flips
+
+        if self.current_player == BLACK:
+            return Position(p, o, WHITE)
+        return Position(o, p, BLACK)
+
+    def pass_move(self):
+        """Returns the Position after the color to move passes"""
+        return Position(self.black, self.white, -self.current_player)
+
+    def is_game_complete(self) -> bool:
+        if (self.black | self.white) == bitops.FULL:
+            return True
+        return bitops.move_mask(self.black, self.white) == 0 and bitops.move_mask(self.white, self.black) == 0
+
+    def count_pieces(self, c: int) -> int:
+        return scoring.popcount(self.get_bits(c))
+
+    def winner(self) -> int:
+        """Color with more discs, or scoring.DRAW"""
+        return scoring.winner(self.black, self.white)
+
+    def final_score(self) -> tuple[int, int]:
+        """(black, white) score with empty squares awarded to the winner"""
+        return scoring.final_score(self.black, self.white)
+
+    def print(self):
+        self.to_board().print()
@@ -0,0 +1,70 @@
+import numpy as np
+
+from src.othello import color
+
+DRAW = 0
+
+_BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits) -> int:
+    """Counts the set bits of a single board (int or np.uint64)"""
+    return int(bits).bit_count()
+
+
+def popcounts(bits: np.ndarray) -> np.ndarray:
+    """Counts the set bits of every board in a uint64 array"""
+    bits = np.ascontiguousarray(bits, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):  # NumPy >= 2.0
+        return np.bitwise_count(bits).astype(np.int64)
+    return _BYTE_COUNTS[bits.view(np.uint8)].reshape(bits.shape + (8,)).sum(axis=-1, dtype=np.int64)
+
+
+def disc_diff(own, opp) -> int:
+    """Disc differential of own over opp"""
+    return popcount(own) - popcount(opp)
+
+
+def disc_diffs(own: np.ndarray, opp: np.ndarray) -> np.ndarray:
+    """Vectorized disc_diff"""
+    return popcounts(own) - popcounts(opp)
+
+
+def win_score(own, opp) -> int:
+    """1 if own has more discs than opp, 0 otherwise. This is the result MCTS backs up."""
+    return 1 if popcount(own) > popcount(opp) else 0
+
+
+def win_scores(own: np.ndarray, opp: np.ndarray) -> np.ndarray:
+    """Vectorized win_score"""
+    return (disc_diffs(own, opp) > 0).astype(np.int64)
+
+
+def winner(black, white) -> int:
+    """
+    :return: color.BLACK or color.WHITE for the side with more discs, DRAW (0) on a tie
+    """
+    diff = disc_diff(black, white)
+    if diff > 0:
+        return color.BLACK
+    if diff < 0:
+        return color.WHITE
+    return DRAW
+
+
+def final_score(black, white) -> tuple[int, int]:
+    """
+    Final score of a finished game, with empty squares awarded to the winner.
+    :return: (black discs, white discs), summing to 64
+    """
+    b = popcount(black)
+    w = popcount(white)
+    empties = 64 - b - w
+    if b > w:
+        b += empties
+    elif w > b:
+        w += empties
+    else:
+        b += empties // 2
+        w += empties - empties // 2
+    return b, w
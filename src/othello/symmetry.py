@@ -0,0 +1,128 @@
+"""
+The 8 symmetries of the board (rotations and reflections) as bitboard transforms.
+
+Every transform is a few delta swaps and works on plain int boards as well as on
+np.uint64 arrays. Transforms are numbered 0 to 7, with 0 the identity; INVERSE[t]
+undoes transform t and SQUARES[t][s] is the square that square s is sent to.
+"""
+import numpy as np
+
+from src.othello.bitops import FULL
+
+
+def _delta_swap(x, mask, delta):
+    """Swaps the bits selected by mask with the bits delta places above them"""
+    t = ((x >> delta) ^ x) & mask
+    return x ^ t ^ ((t << delta) & FULL)
+
+
+def flip_vertical(x):
+    """Reverses the order of the ranks"""
+    if isinstance(x, np.ndarray):
+        return x.byteswap()
+    return int.from_bytes(x.to_bytes(8, 'little'), 'big')
+
+
+def mirror_horizontal(x):
+    """Reverses the order of the files"""
+    x = _delta_swap(x, 0x5555555555555555, 1)
+    x = _delta_swap(x, 0x3333333333333333, 2)
+    return _delta_swap(x, 0x0F0F0F0F0F0F0F0F, 4)
+
+
+def transpose(x):
+    """Reflects the board in the diagonal through bit 0 and bit 63"""
+    x = _delta_swap(x, 0x00000000F0F0F0F0, 28)
+    x = _delta_swap(x, 0x0000CCCC0000CCCC, 14)
+    return _delta_swap(x, 0x00AA00AA00AA00AA, 7)
+
+
+def anti_transpose(x):
+    """Reflects the board in the diagonal through bit 7 and bit 56"""
+    x = _delta_swap(x, 0x000000000F0F0F0F, 36)
+    x = _delta_swap(x, 0x0000333300003333, 18)
+    return _delta_swap(x, 0x0055005500550055, 9)
+
+
+def rotate_90(x):
+    return flip_vertical(transpose(x))
+
+
+def rotate_180(x):
+    return flip_vertical(mirror_horizontal(x))
+
+
+def rotate_270(x):
+    return transpose(flip_vertical(x))
+
+
+TRANSFORMS = (lambda x: x, rotate_90, rotate_180, rotate_270,
+              flip_vertical, mirror_horizontal, transpose, anti_transpose)
+INVERSE = (0, 3, 2, 1, 4, 5, 6, 7)
+
+# SQUARES[t][s]: square that transform t moves square s to
+SQUARES = tuple(tuple((f(1 << s)).bit_length() - 1 for s in range(64)) for f in TRANSFORMS)
+# The same as an index array, so arrays indexed by square can be permuted with arr[..., SQUARE_INDEX[t]]
+SQUARE_INDEX = np.array([[SQUARES[INVERSE[t]][s] for s in range(64)] for t in range(8)], dtype=np.intp)
+
+
+def transform(x, t: int):
+    """Applies transform t to a board (int or np.uint64 array)"""
+    return TRANSFORMS[t](x)
+
+
+def transform_square(square: int, t: int) -> int:
+    return SQUARES[t][square]
+
+
+def transform_squares(values: np.ndarray, t: int) -> np.ndarray:
+    """
+    Moves per-square values (e.g. network outputs or move ratios) along with the board.
+    :param values: Array whose last axis is indexed by square
+    :return: Array where the value of square s is found at transform_square(s, t)
+    """
+    return values[..., SQUARE_INDEX[t]]
+
+
+def canonical(black: int, white: int, current_player: int) -> tuple[tuple[int, int, int], int]:
+    """
+    Picks one representative out of the (up to) 8 symmetric variants of a position: the one with the
+    smallest (black, white) bits.
+    :return: (canonical key, transform t taking the position to it). A square s of the canonical
+    position corresponds to transform_square(s, INVERSE[t]) in the original one.
+    """
+    best = (black, white)
+    best_t = 0
+    for t in range(1, 8):
+        f = TRANSFORMS[t]
+        b = f(black)
+        if b > best[0]:
+            continue
+        w = f(white)
+        if (b, w) < best:
+            best = (b, w)
+            best_t = t
+
+    return (best[0], best[1], current_player), best_t
+
+
+def canonical_arrays(black: np.ndarray, white: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Vectorized canonical for uint64 arrays of shape (N,).
+    :return: (canonical black, canonical white, transforms), each of shape (N,)
+    """
+    black = np.asarray(black, dtype=np.uint64)
+    white = np.asarray(white, dtype=np.uint64)
+    best_b = black.copy()
+    best_w = white.copy()
+    best_t = np.zeros(len(black), dtype=np.int8)
+
+    for t in range(1, 8):
+        b = TRANSFORMS[t](black)
+        w = TRANSFORMS[t](white)
+        better = (b < best_b) | ((b == best_b) & (w < best_w))
+        best_b = np.where(better, b, best_b)
+        best_w = np.where(better, w, best_w)
+        best_t[better] = t
+
+    return best_b, best_w, best_t
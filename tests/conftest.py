@@ -0,0 +1,4 @@
+import sys
+
+# src.core parses the program arguments when imported. Keep pytest's own arguments away from it.
+sys.argv = sys.argv[:1]
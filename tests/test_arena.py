@@ -0,0 +1,85 @@
+import math
+
+import pytest
+
+from src.ai.arena import SPRT, Arena, MCTSAgent, RandomAgent, _play_game, elo_difference, expected_score, \
+    openings, wilson_interval
+from src.othello import color, symmetry
+from src.othello.position import Position
+
+
+class ColorRecorder(RandomAgent):
+    def __init__(self):
+        self.colors = set()
+
+    def select(self, position):
+        self.colors.add(position.current_player)
+        return super().select(position)
+
+
+def test_elo_and_expected_score_are_inverse():
+    for elo in (-400, -35, 0, 10, 200):
+        assert elo_difference(expected_score(elo)) == pytest.approx(elo)
+    assert elo_difference(1.0) == math.inf and elo_difference(0.0) == -math.inf
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(0.5, 100)
+    assert low < 0.5 < high
+    assert high - low == pytest.approx(0.19, abs=0.01)
+    assert wilson_interval(1.0, 20)[1] == 1.0
+    assert wilson_interval(0.0, 0) == (0.0, 1.0)
+
+
+@pytest.mark.parametrize('n', [20, 50, 500])
+def test_sprt_accepts_h1_when_every_game_is_won(n):
+    sprt = SPRT(0, 10)
+    assert sprt.llr(n, 0, 0) > sprt.bounds[1]
+    assert sprt.decision(n, 0, 0) == 'H1'
+
+
+@pytest.mark.parametrize('n', [20, 50, 500])
+def test_sprt_accepts_h0_when_every_game_is_lost(n):
+    sprt = SPRT(-10, 0)
+    assert sprt.llr(0, 0, n) < sprt.bounds[0]
+    assert sprt.decision(0, 0, n) == 'H0'
+
+
+def test_sprt_accepts_h0_for_equal_strength():
+    assert SPRT(0, 10).decision(0, 500, 0) == 'H0'
+    assert SPRT(0, 10).decision(5000, 0, 5000) == 'H0'
+
+
+def test_sprt_undecided_on_few_games():
+    assert SPRT().llr(0, 0, 0) == 0.0
+    assert SPRT().decision(3, 1, 2) is None
+    assert SPRT().llr(60, 10, 30) > 0 > SPRT().llr(30, 10, 60)
+
+
+def test_openings_are_distinct_positions():
+    starts = openings(30, plies=4, seed=0)
+    assert len(starts) == 30
+    keys = {symmetry.canonical(p.black, p.white, p.current_player)[0] for p in starts}
+    assert len(keys) == 30
+    assert all(bin(p.black | p.white).count('1') == 8 for p in starts)
+
+
+def test_play_game_seats_agents_on_their_colors():
+    black, white = ColorRecorder(), ColorRecorder()
+    _play_game(black, white, Position(), seed=0)
+    assert black.colors == {color.BLACK}
+    assert white.colors == {color.WHITE}
+
+
+def test_tasks_report_the_color_of_a():
+    a, b = RandomAgent(), RandomAgent()
+    for a_color, (black, white, _, _) in Arena(workers=1, opening_plies=0, seed=0)._tasks(a, b, 4):
+        assert (black is a) == (a_color == color.BLACK)
+        assert (white is a) == (a_color == color.WHITE)
+
+
+def test_match_stops_once_sprt_decides():
+    result = Arena(workers=2, seed=0).match(MCTSAgent(30), RandomAgent(), games=200, sprt=SPRT(0, 100))
+    assert result.decision == 'H1'
+    assert result.games < 200
+    assert result.wins > result.losses
@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+
+from src.othello import batch, bitops
+from src.othello.position import Position
+
+
+def _random_positions(games, seed):
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(games):
+        position = Position()
+        while not position.is_game_complete():
+            positions.append(position)
+            mask = position.legal_mask()
+            position = position.play(rng.choice(list(bitops.iter_squares(mask)))) if mask else position.pass_move()
+    return positions
+
+
+def _bits(positions):
+    p = batch.as_bits([pos.player_bits for pos in positions])
+    o = batch.as_bits([pos.opp_bits for pos in positions])
+    return p, o
+
+
+def test_move_masks_match_bitops():
+    positions = _random_positions(20, seed=0)
+    p, o = _bits(positions)
+    expected = [bitops.move_mask(pos.player_bits, pos.opp_bits) for pos in positions]
+    assert batch.move_masks(p, o).tolist() == expected
+
+
+def test_expand_matches_play():
+    positions = _random_positions(5, seed=1)
+    p, o = _bits(positions)
+    moves, _, p_next, o_next = batch.expand(p, o)
+
+    for i, pos in enumerate(positions):
+        assert int(moves[i]) == pos.legal_mask()
+        for square in bitops.iter_squares(pos.legal_mask()):
+            child = pos.play(square)
+            # The mover's bits after the move are the opponent bits of the child
+            assert int(p_next[i, square]) == child.opp_bits
+            assert int(o_next[i, square]) == child.player_bits
+
+
+def test_pass_leaves_board_unchanged():
+    p, o = _bits(_random_positions(1, seed=2))
+    p_next, o_next = batch.play(p, o, np.zeros_like(p))
+    assert np.array_equal(p_next, p) and np.array_equal(o_next, o)
@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.othello import bitops
+from src.othello.game_logic import GameBoard, BitBoard, Move
+
+
+def _random_games(games, seed):
+    """Yields (int board, numpy board) after every move of random games played on both backends in lockstep"""
+    rng = random.Random(seed)
+    for _ in range(games):
+        int_board = GameBoard(BitBoard(-1), BitBoard(1), backend='int')
+        np_board = GameBoard(BitBoard(-1), BitBoard(1), backend='numpy')
+        while not np_board.is_game_complete():
+            legal = np_board.legal_moves(np_board.current_player)
+            if len(legal) == 0:
+                int_board.apply_pass()
+                np_board.apply_pass()
+            else:
+                m = rng.choice(legal)
+                int_board.apply_move(Move(m.color, m.pos))
+                np_board.apply_move(m)
+            yield int_board, np_board
+        assert int_board.is_game_complete()
+
+
+def test_backends_agree():
+    for int_board, np_board in _random_games(50, seed=0):
+        assert int_board.is_game_complete() is np_board.is_game_complete()
+        for c in (-1, 1):
+            int_mask = int_board._generate_move_mask(int_board.get_bitboard(c), int_board.get_bitboard(-c))
+            np_mask = np_board._generate_move_mask(np_board.get_bitboard(c), np_board.get_bitboard(-c))
+            assert int(int_mask) == int(np_mask)
+            assert int_board.get_bitboard(c).bits == np_board.get_bitboard(c).bits
+
+
+def test_flip_mask_matches_board():
+    for _, board in _random_games(20, seed=1):
+        c = board.current_player
+        p, o = int(board.get_bitboard(c).bits), int(board.get_bitboard(-c).bits)
+        for square in bitops.iter_squares(bitops.move_mask(p, o)):
+            flips = bitops.flip_mask(p, o, square)
+            assert flips != 0
+            assert flips & ~o == 0
+
+
+@pytest.mark.parametrize('mask', [1, 1 << 63, 0x8000000000000001, 0x0000001818000000])
+def test_square_iteration(mask):
+    squares = list(bitops.iter_squares(mask))
+    assert squares == sorted(squares)
+    assert sum(1 << s for s in squares) == mask
+    assert bitops.lowest_square(mask) == squares[0]
+    assert [bitops.nth_square(mask, n) for n in range(len(squares))] == squares
+    assert bitops.random_square(mask, random.Random(0)) in squares
+
+
+def test_initial_moves():
+    board = GameBoard(BitBoard(-1), BitBoard(1), backend='int')
+    assert np.uint64(board.legal_mask(-1)).item().bit_count() == 4
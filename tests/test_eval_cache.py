@@ -0,0 +1,40 @@
+import pytest
+
+from src.ai import rollout
+from src.ai.eval_cache import EvalCache, SharedEvalCache
+from src.othello.position import Position
+
+# Full board, 32 discs each
+DRAWN = Position(black=0x00000000FFFFFFFF, white=0xFFFFFFFF00000000, current_player=-1)
+# Full board, black ahead 40 to 24
+BLACK_WINS = Position(black=0x000000FFFFFFFFFF, white=0xFFFFFF0000000000, current_player=1)
+
+
+@pytest.fixture(params=['local', 'shared'])
+def cache(request):
+    if request.param == 'local':
+        return EvalCache(capacity=16, min_samples=2)
+    return SharedEvalCache(size=16, min_samples=2)
+
+
+@pytest.mark.parametrize('position', [DRAWN, BLACK_WINS])
+def test_cached_results_match_random_rollout(cache, position):
+    for _ in range(4):
+        for color in (-1, 1):
+            assert cache.rollout(position, color) == rollout.random_rollout(position, color)
+    assert cache.hits > 0
+
+
+def test_draw_is_a_win_for_neither_color(cache):
+    for _ in range(3):
+        assert cache.rollout(DRAWN, -1) == 0
+        assert cache.rollout(DRAWN, 1) == 0
+
+
+def test_means_of_both_colors_cover_decided_games(cache):
+    position = Position()
+    rollout.seed(0)
+    while cache.hits == 0:
+        cache.rollout(position, -1)
+    black, white = cache.rollout(position, -1), cache.rollout(position, 1)
+    assert 0 <= black + white <= 1
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src.ai import features
+from src.ai.eval_cache import CachedEvaluator
+from src.ai.evaluator import NumpyEvaluator
+from src.othello import symmetry
+from src.othello.position import Position
+
+
+@pytest.fixture
+def evaluator(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path / 'model.npz'
+    np.savez(path, activations=np.array(['relu', 'sigmoid']),
+             kernel_0=rng.normal(size=(129, 16)).astype(np.float32), bias_0=np.zeros(16, dtype=np.float32),
+             kernel_1=rng.normal(size=(16, 64)).astype(np.float32), bias_1=np.zeros(64, dtype=np.float32))
+    return NumpyEvaluator(str(path))
+
+
+def _variants(position):
+    return [Position(symmetry.transform(position.black, t), symmetry.transform(position.white, t),
+                     position.current_player) for t in range(8)]
+
+
+# Not canonical: canonical() takes it there with rotate_90
+POSITION = Position(black=69392670720, white=34628173824, current_player=1)
+
+
+def test_network_sees_canonical_inputs(evaluator):
+    key, t = symmetry.canonical(*POSITION.key())
+    assert t != 0
+    expected = evaluator.predict(features.encode_positions([Position(*key)]))[0]
+    priors, _ = evaluator.evaluate([POSITION])
+    legal = np.array([(POSITION.legal_mask() >> s) & 1 for s in range(64)], dtype=bool)
+    # Output of canonical square s belongs to square transform_square(s, INVERSE[t]) of the position
+    moved = symmetry.transform_squares(expected, symmetry.INVERSE[t])
+    np.testing.assert_allclose(priors[0], np.where(legal, moved, 0) / np.where(legal, moved, 0).sum(),
+                               rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize('wrap', [False, True])
+def test_symmetric_variants_get_transformed_priors(evaluator, wrap):
+    if wrap:
+        evaluator = CachedEvaluator(evaluator)
+    variants = _variants(POSITION)
+    priors, values = evaluator.evaluate(variants)
+
+    np.testing.assert_allclose(values, values[0], rtol=1e-6)
+    for t in range(8):
+        np.testing.assert_allclose(priors[t], symmetry.transform_squares(priors[0], t), rtol=1e-5, atol=1e-7)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from src.ai.evaluator import NumpyEvaluator
+from src.ai.inference_server import InferenceServer
+
+
+@pytest.fixture
+def weights(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path / 'model.npz'
+    np.savez(path, activations=np.array(['relu', 'sigmoid']),
+             kernel_0=rng.normal(size=(129, 8)).astype(np.float32), bias_0=np.zeros(8, dtype=np.float32),
+             kernel_1=rng.normal(size=(8, 64)).astype(np.float32), bias_1=np.zeros(64, dtype=np.float32))
+    return str(path)
+
+
+def test_matches_local_evaluator(weights):
+    x = np.random.default_rng(1).integers(0, 2, size=(5, 129)).astype(np.float32)
+    with InferenceServer(weights, clients=2) as server:
+        out = server.client().predict(x)
+    np.testing.assert_allclose(out, NumpyEvaluator(weights).predict(x), rtol=1e-5)
+
+
+def test_network_error_is_sent_back(weights):
+    with InferenceServer(weights, clients=2) as server:
+        client = server.client()
+        with pytest.raises(RuntimeError, match='failed on a batch'):
+            client.predict(np.zeros((2, 7), dtype=np.float32))
+        # The server keeps serving after a failed batch
+        assert client.predict(np.zeros((1, 129), dtype=np.float32)).shape == (1, 64)
+
+
+def test_load_error_is_sent_back(tmp_path):
+    with InferenceServer(str(tmp_path / 'missing.npz'), clients=2) as server:
+        with pytest.raises(RuntimeError, match='could not load'):
+            server.client().predict(np.zeros((1, 129), dtype=np.float32))
+
+
+def test_client_gives_up_on_dead_server(weights):
+    server = InferenceServer(weights, clients=2, timeout=1.0)
+    server.start()
+    client = server.client()
+    client.predict(np.zeros((1, 129), dtype=np.float32))
+
+    server._process.kill()
+    server._process.join()
+    with pytest.raises(RuntimeError, match='has not responded'):
+        client.predict(np.zeros((1, 129), dtype=np.float32))
@@ -0,0 +1,27 @@
+import pytest
+
+from src.ai.eval_cache import EvalCache, SharedEvalCache
+from src.ai.mcts import MCTS
+from src.ai.selection import UCT
+from src.ai.transposition import TranspositionTable
+from src.othello.position import Position
+
+
+def test_root_parallel_rejects_process_local_state():
+    with pytest.raises(ValueError):
+        MCTS(Position(), workers=2, transposition_table=TranspositionTable())
+    with pytest.raises(ValueError):
+        MCTS(Position(), workers=2, eval_cache=EvalCache())
+
+
+def test_root_parallel_uses_shared_cache_and_selection():
+    cache = SharedEvalCache(size=1 << 12)
+    mcts = MCTS(Position(), iter_max=50, workers=2, selection=UCT(0.5), eval_cache=cache)
+    try:
+        children = mcts.search(return_nodes=True)
+    finally:
+        mcts.close()
+
+    assert mcts.root.visits == 100
+    assert sum(c.visits for c in children) == 100
+    assert cache.hits + cache.misses > 0
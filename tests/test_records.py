@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from src.ai import records
+from src.ai.state_save import SavedMoveData, StateSave
+
+
+def _state(i):
+    results = [SavedMoveData(19, 'd3', 7 + i, 10 + i, (7 + i) / (10 + i)),
+               SavedMoveData(26, 'c4', 2.5, 5, 0.5)]
+    return StateSave((1 << 40) + i, (1 << 20) + i, -1 if i % 2 == 0 else 1, results)
+
+
+def test_from_states_matches_from_state():
+    states = [_state(i) for i in range(5)]
+    batched = records.from_states(states)
+    single = np.concatenate([records.from_state(s) for s in states])
+    assert batched.tobytes() == single.tobytes()
+
+
+def test_state_dict_round_trip():
+    state = _state(3)
+    d = records.to_state_dict(records.from_state(state)[0])
+    assert d['bits_black'] == str(state.bits_black)
+    assert d['current_player'] == state.current_player
+    # Most visited move first
+    assert [next(iter(r)) for r in d['results']] == [19, 26]
+    assert d['results'][1][26]['wins'] == 2.5
+
+
+def test_append_and_load(tmp_path):
+    path = tmp_path / 'data.rec'
+    assert records.append(path, records.from_states([_state(0), _state(1)])) == 2
+    assert records.append(path, records.from_state(_state(2))) == 3
+
+    recs = records.load(path)
+    assert recs.dtype == records.RECORD_DTYPE
+    assert recs['black'].tolist() == [(1 << 40) + i for i in range(3)]
+    assert np.array_equal(records.load(path, mmap=False), recs)
+
+
+def test_append_cuts_torn_record(tmp_path):
+    path = tmp_path / 'data.rec'
+    records.append(path, records.from_state(_state(0)))
+    with open(path, 'ab') as f:
+        f.write(b'\x01' * 100)
+    assert records.count(path) == 1
+
+    assert records.append(path, records.from_state(_state(1))) == 2
+    assert records.load(path)['black'].tolist() == [1 << 40, (1 << 40) + 1]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'data.rec'
+    path.write_bytes(b'not a record file')
+    with pytest.raises(ValueError):
+        records.load(path)
@@ -0,0 +1,43 @@
+import numpy as np
+
+from src.ai import rollout
+from src.ai.mcts import MCTSNode
+from src.othello import scoring
+from src.othello.position import Position
+
+# Mid-game position, black to move after 30 random plies
+POSITION = Position(black=53893234429952, white=2899272507293303808, current_player=-1)
+ROLLOUTS = 4000
+
+
+def _single_win_rate(position, color):
+    rollout.seed(0)
+    return np.mean([rollout.random_rollout(position, color) for _ in range(ROLLOUTS)])
+
+
+def test_random_rollouts_score_the_side_to_move():
+    p = np.full(16, POSITION.player_bits, dtype=np.uint64)
+    o = np.full(16, POSITION.opp_bits, dtype=np.uint64)
+    diffs = rollout.random_rollouts(p, o, np.random.default_rng(0))
+    assert np.all(np.abs(diffs) <= 64)
+    assert np.array_equal(rollout.rollout_scores(p, o, np.random.default_rng(0)), (diffs > 0).astype(np.int64))
+
+
+def test_finished_position_scores_immediately():
+    full = (1 << 64) - 1
+    position = Position(black=full & ~0xFF, white=0xFF, current_player=-1)
+    diffs = rollout.random_rollouts([position.player_bits], [position.opp_bits])
+    assert diffs[0] == scoring.disc_diff(position.player_bits, position.opp_bits)
+
+
+def test_batch_matches_single_rollouts_for_side_to_move():
+    node = MCTSNode(POSITION)
+    batched = node.rollout_batch(POSITION.current_player, ROLLOUTS, np.random.default_rng(1)) / ROLLOUTS
+    assert abs(batched - _single_win_rate(POSITION, POSITION.current_player)) < 0.03
+
+
+def test_batch_matches_single_rollouts_for_opponent():
+    node = MCTSNode(POSITION)
+    color = -POSITION.current_player
+    batched = node.rollout_batch(color, ROLLOUTS, np.random.default_rng(1)) / ROLLOUTS
+    assert abs(batched - _single_win_rate(POSITION, color)) < 0.03
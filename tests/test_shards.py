@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from src.ai import records, shards
+from src.ai.state_save import SavedMoveData, StateSave
+from src.othello import symmetry
+from src.othello.position import Position
+
+
+def _state(position: Position, square=None, wins=3, visits=5):
+    square = square if square is not None else next(iter(position.legal_moves())).pos
+    return StateSave(position.black, position.white, position.current_player,
+                     [SavedMoveData(square, '', wins, visits, wins / visits)])
+
+
+POSITIONS = [Position(), Position().play(19), Position().play(19).play(18)]
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return tmp_path / 'shards'
+
+
+def test_resume_after_torn_record(directory):
+    with shards.ShardWriter(directory, 0, fsync_every=1) as writer:
+        writer.write(_state(POSITIONS[0]))
+        writer.write(_state(POSITIONS[1]))
+    with open(writer.path, 'ab') as f:
+        f.write(b'\x07' * 100)
+
+    resumed = shards.ShardWriter(directory, 0)
+    assert resumed.written == 2
+    resumed.write(_state(POSITIONS[2]))
+    resumed.close()
+
+    assert resumed.written == 3
+    assert records.load(resumed.path)['black'].tolist() == [p.black for p in POSITIONS]
+
+
+@pytest.mark.parametrize('content', [b'', b'OREC\x01'])
+def test_empty_or_headerless_shard(directory, tmp_path, content):
+    directory.mkdir()
+    (directory / 'shard-0.rec').write_bytes(content)
+    with shards.ShardWriter(directory, 1, fsync_every=1) as other:
+        other.write(_state(POSITIONS[0]))
+
+    writer = shards.ShardWriter(directory, 0)
+    assert writer.written == 0
+    assert len(records.load(writer.path)) == 0
+
+    # A bad shard does not block compaction of the others
+    assert shards.compact(directory, tmp_path / 'data.rec') == 1
+
+    writer.write(_state(POSITIONS[1]))
+    writer.close()
+    assert writer.written == 1
+
+
+def test_compact_is_idempotent(directory, tmp_path):
+    data_path = tmp_path / 'data.rec'
+    for worker_id, positions in enumerate((POSITIONS[:2], POSITIONS[1:])):
+        with shards.ShardWriter(directory, worker_id) as writer:
+            for p in positions:
+                writer.write(_state(p))
+
+    assert shards.compact(directory, data_path) == 3
+    assert shards.shard_paths(directory) == []
+    first = data_path.read_bytes()
+
+    assert shards.compact(directory, data_path) == 3
+    assert data_path.read_bytes() == first
+
+
+def test_dedupe_counts_symmetric_variants_once():
+    position = POSITIONS[2]
+    variants = [Position(symmetry.transform(position.black, t), symmetry.transform(position.white, t),
+                         position.current_player) for t in range(8)]
+    recs = records.from_states([_state(v) for v in variants])
+    assert len(shards.dedupe(recs)) == 1
+
+
+def test_index_finds_position_stored_under_another_symmetry():
+    position = POSITIONS[2]
+    square = max(position.legal_moves(), key=lambda m: m.pos).pos
+    index = shards.RecordIndex(records.from_state(_state(position, square, wins=4, visits=8)))
+
+    for t in range(8):
+        variant = Position(symmetry.transform(position.black, t), symmetry.transform(position.white, t),
+                           position.current_player)
+        found = index.find_best_move(variant.black, variant.white, variant.current_player)
+        assert found.pos == symmetry.transform_square(square, t)
+        assert found.visits == 8 and found.ratio == pytest.approx(0.5)
+        assert variant.legal_mask() >> found.pos & 1
+
+    assert index.find_best_move(Position().black, Position().white, Position().current_player) is None
+
+
+def test_compact_keeps_newest_search(directory, tmp_path):
+    data_path = tmp_path / 'data.rec'
+    position = POSITIONS[1]
+    mirrored = Position(symmetry.transform(position.black, 5), symmetry.transform(position.white, 5),
+                        position.current_player)
+    records.write(data_path, records.from_states([_state(POSITIONS[0]), _state(position, visits=5)]))
+    with shards.ShardWriter(directory, 0) as writer:
+        writer.write(_state(mirrored, wins=40, visits=50))
+
+    assert shards.compact(directory, data_path) == 2
+    merged = records.load(data_path)
+    assert merged['black'].tolist() == [POSITIONS[0].black, mirrored.black]
+    assert merged['visits'].max(axis=1).tolist() == [5, 50]
+
+    found = shards.RecordIndex.load(directory, data_path).find_best_move(
+        position.black, position.white, position.current_player)
+    assert found.visits == 50
@@ -0,0 +1,61 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.othello import bitops, symmetry
+from src.othello.position import Position
+
+
+def _random_positions(n, seed):
+    rng = random.Random(seed)
+    positions = []
+    position = Position()
+    while len(positions) < n:
+        if position.is_game_complete():
+            position = Position()
+        positions.append(position)
+        mask = position.legal_mask()
+        position = position.play(rng.choice(list(bitops.iter_squares(mask)))) if mask else position.pass_move()
+    return positions
+
+
+@pytest.mark.parametrize('t', range(8))
+def test_inverse_restores_board(t):
+    for position in _random_positions(50, seed=t):
+        assert symmetry.transform(symmetry.transform(position.black, t), symmetry.INVERSE[t]) == position.black
+
+
+@pytest.mark.parametrize('t', range(8))
+def test_transforms_commute_with_move_generation(t):
+    for position in _random_positions(100, seed=t):
+        moved = Position(symmetry.transform(position.black, t), symmetry.transform(position.white, t),
+                         position.current_player)
+        assert moved.legal_mask() == symmetry.transform(position.legal_mask(), t)
+
+
+@pytest.mark.parametrize('t', range(8))
+def test_transform_squares_follows_the_board(t):
+    values = np.arange(64)
+    moved = symmetry.transform_squares(values, t)
+    for s in range(64):
+        assert moved[symmetry.transform_square(s, t)] == values[s]
+
+
+def test_canonical_is_shared_by_all_variants():
+    for position in _random_positions(50, seed=0):
+        key, t = symmetry.canonical(position.black, position.white, position.current_player)
+        assert (symmetry.transform(position.black, t), symmetry.transform(position.white, t)) == key[:2]
+        for v in range(8):
+            variant = symmetry.canonical(symmetry.transform(position.black, v), symmetry.transform(position.white, v),
+                                         position.current_player)
+            assert variant[0] == key
+
+
+def test_canonical_arrays_match_canonical():
+    positions = _random_positions(200, seed=1)
+    black, white, _ = symmetry.canonical_arrays(np.array([p.black for p in positions], dtype=np.uint64),
+                                                np.array([p.white for p in positions], dtype=np.uint64))
+    for i, p in enumerate(positions):
+        key, _ = symmetry.canonical(p.black, p.white, p.current_player)
+        assert (int(black[i]), int(white[i])) == key[:2]